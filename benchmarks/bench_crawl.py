@@ -0,0 +1,139 @@
+"""End-to-end crawl benchmark against the local fixture server.
+
+    python benchmarks/bench_crawl.py [--latency-ms 20] [--pages 20] [--json results.json]
+
+Each scenario runs scrape() in a fresh process (so peak RSS is its own)
+against benchmarks/fixture_server.py and reports wall time, pages/sec,
+requests issued per kind, peak RSS, the crawl's per-stage timings
+(core.metrics) and the parse cost per page measured offline on the same
+fixture pages. Results are printed as a table and written as JSON for
+comparing runs.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_server import FixtureServer, FixtureSite  # noqa: E402
+
+SCENARIOS: List[Dict] = [
+    {"name": "quotes-sync", "mode": "quotes", "engine": "sync"},
+    {"name": "quotes-async", "mode": "quotes", "engine": "async"},
+    {"name": "shop-sync", "mode": "shop", "engine": "sync"},
+    {"name": "shop-sync-workers", "mode": "shop", "engine": "sync", "review_workers": 4},
+    {"name": "shop-async", "mode": "shop", "engine": "async"},
+    {"name": "shop-sync-fanout", "mode": "shop", "engine": "sync", "review_workers": 4, "fanout": 8},
+    {"name": "shop-async-fanout", "mode": "shop", "engine": "async", "fanout": 8},
+    {"name": "shop-sync-ldjson-head", "mode": "shop", "engine": "sync", "stop_after_ldjson": True},
+]
+
+
+def _parse_us(site: FixtureSite, mode: str, repeat: int = 20) -> Dict[str, float]:
+    from core.parser import find_next_page, parse_items
+    from core.shop import parse_products, parse_reviews
+
+    def timed(func) -> float:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - t0) / repeat * 1e6
+
+    if mode == "shop":
+        listing, product = site.shop_page(1), site.product_page("1-0")
+        return {"listing": timed(lambda: parse_products(listing, "http://x/shop")),
+                "product": timed(lambda: parse_reviews(product))}
+    page = site.quotes_page(1)
+    return {"listing": timed(lambda: (parse_items(page, "http://x/"), find_next_page(page, "http://x/")))}
+
+
+def _run_scenario(base_url: str, site: FixtureSite, scenario: Dict) -> Dict:
+    # runs in a child process
+    logging.disable(logging.CRITICAL)
+    from core.metrics import get_metrics
+    from scraper import scrape
+
+    options = {k: v for k, v in scenario.items() if k not in ("name", "mode")}
+    start = f"{base_url}/shop?page=1" if scenario["mode"] == "shop" else f"{base_url}/quotes"
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        scrape(start, os.path.join(tmp, "out.csv"), delay=0, max_pages=site.pages + 1, mode=scenario["mode"],
+               max_rate=10000.0, **options)
+        wall = time.perf_counter() - t0
+    return {
+        "wall_s": wall,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": get_metrics().summary()["stages"],
+        "parse_us_per_page": _parse_us(site, scenario["mode"]),
+    }
+
+
+def run(args) -> Dict:
+    site = FixtureSite(args.pages, args.items, args.reviews, args.page_kb)
+    names = set(args.scenario or [])
+    scenarios = [s for s in SCENARIOS if not names or s["name"] in names]
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with FixtureServer(site, args.latency_ms) as server:
+        for scenario in scenarios:
+            for _ in range(args.repeat):
+                server.reset_counts()
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    res = pool.submit(_run_scenario, server.base_url, site, scenario).result()
+                requests = dict(server.requests)
+                pages = requests.get("listing", 0) + requests.get("product", 0)
+                results.append({
+                    "scenario": scenario["name"],
+                    "options": {k: v for k, v in scenario.items() if k != "name"},
+                    "pages": pages,
+                    "pages_per_s": pages / res["wall_s"] if res["wall_s"] else 0.0,
+                    "requests": requests,
+                    **res,
+                })
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "fixture": {"latency_ms": args.latency_ms, "pages": args.pages, "items": args.items,
+                    "reviews": args.reviews, "page_kb": args.page_kb},
+        "results": results,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark scrape() end to end against a local fixture server")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="Delay added to every response")
+    ap.add_argument("--pages", type=int, default=20, help="Listing pages per site")
+    ap.add_argument("--items", type=int, default=10, help="Quotes / products per listing page")
+    ap.add_argument("--reviews", type=int, default=10, help="Reviews per product page")
+    ap.add_argument("--page-kb", type=int, default=20, help="Filler markup per page, KB")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per scenario")
+    ap.add_argument("--scenario", action="append", choices=[s["name"] for s in SCENARIOS],
+                    help="Only run this scenario (repeatable)")
+    ap.add_argument("--json", default=None, help="Write the results to this file")
+    args = ap.parse_args()
+
+    report = run(args)
+    for r in report["results"]:
+        parse = " ".join(f"{k}={v:.0f}us" for k, v in r["parse_us_per_page"].items())
+        print(f"{r['scenario']:<20} {r['wall_s']:7.2f} s  {r['pages_per_s']:7.1f} pages/s  "
+              f"{sum(r['requests'].values()):5d} req  {r['peak_rss_kb'] / 1024:6.1f} MB  parse {parse}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Compare the raw-markup JSON-LD scanner with the BeautifulSoup path.
+
+    python benchmarks/bench_ldjson.py [saved_page.html ...]
+
+Saved product pages can be passed as fixtures; without arguments a synthetic
+~500 KB product page (large DOM, one Product block with reviews) is used.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ldjson import _soup_ldjson, scan_ldjson  # noqa: E402
+
+
+def synthetic_page(reviews: int = 50, filler_rows: int = 4000) -> bytes:
+    product = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": "Synthetic product",
+        "offers": {"@type": "Offer", "price": "19.99", "priceCurrency": "EUR"},
+        "aggregateRating": {"ratingValue": "4.4", "reviewCount": str(reviews)},
+        "review": [
+            {"@type": "Review", "author": {"name": f"user{i}"},
+             "reviewRating": {"ratingValue": str(i % 5 + 1)}, "reviewBody": "Lorem ipsum dolor sit amet. " * 4}
+            for i in range(reviews)
+        ],
+    }
+    rows = "".join(
+        f'<div class="row" data-i="{i}"><a href="/c/{i}">Category {i}</a><span>item</span></div>\n'
+        for i in range(filler_rows)
+    )
+    script = "<script>window.__STATE__ = {\"cart\": [], \"flags\": {\"a\": true}};</script>\n" * 20
+    html = (f"<!doctype html><html><head><title>p</title>{script}"
+            f'<script type="application/ld+json">{json.dumps(product)}</script></head>'
+            f"<body>{rows}</body></html>")
+    return html.encode("utf-8")
+
+
+def main(paths):
+    fixtures = [(os.path.basename(p), open(p, "rb").read()) for p in paths] or [("synthetic", synthetic_page())]
+    for name, raw in fixtures:
+        fast = scan_ldjson(raw)
+        slow = _soup_ldjson(raw)
+        if fast is not None and fast != slow:
+            print(f"{name}: scanner and soup disagree", file=sys.stderr)
+        n = 20
+        t_fast = timeit.timeit(lambda: scan_ldjson(raw), number=n) / n
+        t_slow = timeit.timeit(lambda: _soup_ldjson(raw), number=n) / n
+        path = "scanner" if fast is not None else "fallback"
+        print(f"{name}: {len(raw) / 1024:.0f} KB  soup {t_slow * 1000:.2f} ms  "
+              f"scan {t_fast * 1000:.2f} ms ({path})  speedup x{t_slow / t_fast:.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
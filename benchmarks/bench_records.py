@@ -0,0 +1,66 @@
+"""Memory held per product / review: plain dicts vs the __slots__ records.
+
+    python benchmarks/bench_records.py [products] [reviews_per_product]
+
+Builds the same catalog both ways (defaults: 20000 products with 10 reviews
+each) and reports the bytes tracemalloc sees per record. Field values are
+created once and shared, so the numbers are the container overhead only.
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.records import Product, Review  # noqa: E402
+
+
+def _values(products: int, reviews: int):
+    return [
+        (f"Product {i}", f"https://shop.example/p/{i}",
+         [(f"user{j}", f"Review {j} of product {i}") for j in range(reviews)])
+        for i in range(products)
+    ]
+
+
+def as_dicts(values):
+    out = []
+    for title, url, revs in values:
+        p = {"title": title, "description": None, "sku": None, "brand": None, "price": "9.99",
+             "currency": "EUR", "availability": None, "url": url, "rating": 4.5, "review_count": len(revs)}
+        p["reviews"] = [{"product": title, "author": a, "rating": 5.0, "body": b} for a, b in revs]
+        out.append(p)
+    return out
+
+
+def as_records(values):
+    out = []
+    for title, url, revs in values:
+        p = Product(title=title, price="9.99", currency="EUR", url=url, rating=4.5, review_count=len(revs))
+        p.reviews = [Review(title, a, 5.0, b) for a, b in revs]
+        out.append(p)
+    return out
+
+
+def measure(build, values) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(values)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main(products: int = 20000, reviews: int = 10):
+    values = _values(products, reviews)
+    records = products * (reviews + 1)
+    d = measure(as_dicts, values)
+    r = measure(as_records, values)
+    print(f"{products} products x {reviews} reviews ({records} records)")
+    print(f"  dict     {d / records:7.1f} B/record  {d / 1024 ** 2:7.1f} MB")
+    print(f"  records  {r / records:7.1f} B/record  {r / 1024 ** 2:7.1f} MB  ({d / r:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
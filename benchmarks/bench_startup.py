@@ -0,0 +1,156 @@
+"""Import-time budget for the entry points.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget scraper=40] [--json startup.json]
+
+Each entry point is imported in a fresh interpreter under `-X importtime`
+(best of --runs) and checked against a time budget and a list of modules
+it must not pull in at import time: the CLI and the GUI only load the
+crawler when a crawl starts, and a plain sync crawl does not load the
+async engine, worker processes or SQLite. An entry point ending in a
+command line (e.g. "scraper.py --help") is run as a script instead, so
+what main() imports is counted too. Exits with status 1 when an
+entry point is over budget, imports a forbidden module or fails to
+start, so it can gate changes that slow startup down or break it; only
+an entry point whose optional dependency is missing here (tkinter for
+the GUI) is skipped.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CRAWLER = ("requests", "bs4", "urllib3", "charset_normalizer", "urllib.robotparser", "asyncio", "sqlite3",
+            "multiprocessing")
+
+# module or script command line, budget in ms (cumulative import time), modules it must not import
+ENTRY_POINTS: List[Tuple[str, float, Tuple[str, ...]]] = [
+    ("scraper", 40.0, _CRAWLER),
+    ("scraper.py --help", 40.0, _CRAWLER),
+    ("scraper_gui", 120.0, _CRAWLER),
+    ("core.crawl", 300.0, ("asyncio", "sqlite3", "multiprocessing", "http.server", "core.async_engine",
+                           "core.parse_pool", "core.http_cache", "core.fanout")),
+]
+# entry point -> the optional module whose absence only skips it
+OPTIONAL_DEPS: Dict[str, str] = {"scraper_gui": "tkinter"}
+
+
+class EntryPointFailed(Exception):
+    """The interpreter running an entry point exited with an error; `stderr` has the traceback."""
+
+    def __init__(self, stderr: str):
+        lines = [line for line in stderr.splitlines() if line.strip() and not line.startswith("import time:")]
+        super().__init__(lines[-1] if lines else "exited with an error")
+        self.stderr = "\n".join(lines)
+
+
+def _run_importtime(args: List[str]) -> List[Tuple[str, float, bool]]:
+    """(module, cumulative ms, imported at top level) for each import made by `python args`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise EntryPointFailed(proc.stderr)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|", 2)
+        if not cum.strip().isdigit():
+            continue   # the header line
+        imports.append((name.strip(), int(cum) / 1000.0, not name[1:].startswith(" ")))
+    return imports
+
+
+_STARTUP: List[str] = []
+
+
+def _importtime(entry: str) -> Tuple[float, List[str]]:
+    """(cumulative ms for `entry`, every module imported); raises EntryPointFailed.
+
+    For a script, the time is that of every top-level import beyond what
+    a bare interpreter loads at startup (nested imports are already
+    counted in their parent's cumulative time).
+    """
+    argv = shlex.split(entry)
+    if not argv[0].endswith(".py"):
+        imports = _run_importtime(["-c", f"import {entry}"])
+        cumulative = next((ms for name, ms, top in imports if top and name == entry), 0.0)
+        return cumulative, [name for name, _, _ in imports]
+    if not _STARTUP:
+        _STARTUP.extend(name for name, _, _ in _run_importtime(["-c", "pass"]))
+    imports = _run_importtime(argv)
+    cumulative = sum(ms for name, ms, top in imports if top and name not in _STARTUP)
+    return cumulative, [name for name, _, _ in imports]
+
+
+def run(runs: int, budgets: Dict[str, float]) -> List[Dict]:
+    results = []
+    for module, budget, forbidden in ENTRY_POINTS:
+        budget = budgets.get(module, budget)
+        try:
+            samples = [_importtime(module) for _ in range(runs)]
+        except EntryPointFailed as e:
+            if _optional_missing(module, e):
+                results.append({"module": module, "skipped": True, "ok": True, "reason": str(e)})
+            else:
+                results.append({"module": module, "error": str(e), "ok": False})
+            continue
+        best = min(ms for ms, _ in samples)
+        loaded = set(samples[0][1])
+        bad = sorted(m for m in forbidden if m in loaded)
+        results.append({
+            "module": module,
+            "import_ms": round(best, 2),
+            "budget_ms": budget,
+            "modules": len(loaded),
+            "forbidden": bad,
+            "ok": best <= budget and not bad,
+        })
+    return results
+
+
+def _optional_missing(entry: str, failure: EntryPointFailed) -> bool:
+    """True if `entry` failed only because its optional dependency can't be imported here."""
+    dep = OPTIONAL_DEPS.get(entry)
+    if dep is None or not str(failure).startswith(("ImportError", "ModuleNotFoundError")):
+        return False
+    # "No module named 'tkinter'", or tkinter present without its Tk library
+    return f"'{dep}'" in str(failure) or f"'_{dep}'" in str(failure) or f"/{dep}/" in failure.stderr
+
+
+def _budget(value: str) -> Tuple[str, float]:
+    module, _, ms = value.partition("=")
+    return module, float(ms)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the import time of the entry points against a budget")
+    ap.add_argument("--runs", type=int, default=5, help="Imports per entry point; the fastest counts")
+    ap.add_argument("--budget", type=_budget, action="append", default=[], metavar="MODULE=MS",
+                    help="Override the budget of one entry point (repeatable)")
+    ap.add_argument("--json", default=None, help="Write the results to this file")
+    args = ap.parse_args()
+
+    results = run(max(1, args.runs), dict(args.budget))
+    for r in results:
+        if r.get("skipped"):
+            print(f"{r['module']:<18} skipped ({r['reason']})")
+            continue
+        if "error" in r:
+            print(f"{r['module']:<18} FAILED  {r['error']}")
+            continue
+        status = "ok" if r["ok"] else "OVER BUDGET" if not r["forbidden"] else "FORBIDDEN IMPORTS"
+        extra = f"  imports {', '.join(r['forbidden'])}" if r["forbidden"] else ""
+        print(f"{r['module']:<18} {r['import_ms']:8.1f} ms  budget {r['budget_ms']:6.1f} ms  "
+              f"{r['modules']:4d} modules  {status}{extra}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Local HTTP server with synthetic quotes and shop sites for benchmarks.
+
+    python benchmarks/fixture_server.py [--port 8765] [--latency-ms 20] ...
+
+Quotes pages live at /quotes/page/N (div.quote blocks, li.next link),
+shop listings at /shop?page=N (one JSON-LD Product per item) and product
+pages at /p/<page>-<i> (JSON-LD Product with reviews). Every response is
+delayed by `latency_ms` and padded with `page_kb` of filler markup.
+Requests are counted per kind so a benchmark can report what a crawl cost.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class FixtureSite:
+    """Page generator shared by the server and by offline parse timings."""
+
+    def __init__(self, pages: int = 20, items: int = 10, reviews: int = 10, page_kb: int = 20):
+        self.pages = pages
+        self.items = items
+        self.reviews = reviews
+        self.page_kb = page_kb
+
+    def _filler(self) -> str:
+        row = '<div class="row"><a href="/c/1">Category</a><span>filler text</span></div>\n'
+        return row * (self.page_kb * 1024 // len(row))
+
+    def quotes_page(self, n: int) -> str:
+        quotes = "".join(
+            f'<div class="quote"><span class="text">Quote {i} on page {n}</span>'
+            f'<small class="author">Author {i}</small>'
+            f'<div class="tags"><a class="tag" href="/tag/a">a</a><a class="tag" href="/tag/b">b</a></div></div>'
+            for i in range(self.items)
+        )
+        nxt = f'<ul class="pager"><li class="next"><a href="/quotes/page/{n + 1}/">Next</a></li></ul>' \
+            if n < self.pages else ""
+        return f"<html><head><title>Quotes {n}</title></head><body>{quotes}{nxt}{self._filler()}</body></html>"
+
+    def shop_page(self, n: int) -> str:
+        products = [] if n > self.pages else [
+            {"@context": "https://schema.org", "@type": "Product", "name": f"Product {n}-{i}",
+             "url": f"/p/{n}-{i}", "sku": f"SKU{n}{i}", "brand": {"@type": "Brand", "name": "Acme"},
+             "offers": {"@type": "Offer", "price": f"{i}.99", "priceCurrency": "EUR"},
+             "aggregateRating": {"ratingValue": "4.5", "reviewCount": str(self.reviews)}}
+            for i in range(self.items)
+        ]
+        blocks = "".join(f'<script type="application/ld+json">{json.dumps(p)}</script>' for p in products)
+        return f"<html><head><title>Shop {n}</title>{blocks}</head><body>{self._filler()}</body></html>"
+
+    def product_page(self, key: str) -> str:
+        product = {
+            "@context": "https://schema.org", "@type": "Product", "name": f"Product {key}",
+            "review": [
+                {"@type": "Review", "author": {"@type": "Person", "name": f"user{j}"},
+                 "reviewRating": {"ratingValue": str(j % 5 + 1)},
+                 "reviewBody": f"Review {j} of product {key}. " * 3}
+                for j in range(self.reviews)
+            ],
+        }
+        return (f'<html><head><script type="application/ld+json">{json.dumps(product)}</script></head>'
+                f"<body>{self._filler()}</body></html>")
+
+    def route(self, path: str) -> Tuple[Optional[str], str]:
+        """(body, kind) for a request path; body None means 404."""
+        u = urlparse(path)
+        if u.path == "/robots.txt":
+            return "User-agent: *\nAllow: /\n", "robots"
+        if u.path == "/quotes" or u.path.startswith("/quotes/page/"):
+            n = int(u.path.rstrip("/").rsplit("/", 1)[-1]) if "/page/" in u.path else 1
+            return (self.quotes_page(n) if n <= self.pages else None), "listing"
+        if u.path == "/shop":
+            return self.shop_page(int(parse_qs(u.query).get("page", ["1"])[0])), "listing"
+        if u.path.startswith("/p/"):
+            return self.product_page(u.path[3:]), "product"
+        return None, "other"
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # crawlers hang up mid-body on purpose (size caps, --stop-after-ldjson)
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """FixtureSite served from a background thread on 127.0.0.1."""
+
+    def __init__(self, site: FixtureSite, latency_ms: float = 0.0, port: int = 0):
+        self.site = site
+        self.latency = latency_ms / 1000.0
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body, kind = server.site.route(self.path)
+                with server._lock:
+                    server.requests[kind] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                ctype = "text/plain" if kind == "robots" else "text/html; charset=utf-8"
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = _QuietServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the synthetic benchmark sites")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--items", type=int, default=10)
+    ap.add_argument("--reviews", type=int, default=10)
+    ap.add_argument("--page-kb", type=int, default=20)
+    args = ap.parse_args()
+    site = FixtureSite(args.pages, args.items, args.reviews, args.page_kb)
+    with FixtureServer(site, args.latency_ms, args.port) as server:
+        print(f"Serving {server.base_url}/quotes and {server.base_url}/shop (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlparse
+from .charset import Markup
+from .logging_config import get_logger
+
+logger = get_logger()
+
+
+class AsyncFetcher:
+    """Run a blocking fetch function from asyncio with bounded concurrency.
+
+    Requests go through one shared fetch callable (and therefore one shared
+    requests.Session connection pool) on a private thread pool. At most
+    `concurrency` requests are in flight overall and at most `per_host`
+    against any single host.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[Markup]], concurrency: int = 8, per_host: int = 4):
+        self._fetch = fetch
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, min(per_host, self.concurrency))
+        self._global = asyncio.Semaphore(self.concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="fetch")
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_host)
+            self._hosts[host] = sem
+        return sem
+
+    async def fetch(self, url: str, fetch: Optional[Callable[[str], Optional[Markup]]] = None) -> Optional[Markup]:
+        """Fetch `url` within the limits, with `fetch` instead of the default fetch function if given."""
+        # take the host slot first so one slow host can't hold global slots while queued
+        async with self._host_semaphore(url):
+            async with self._global:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fetch or self._fetch, url)
+
+    def blocking_fetch(self) -> Callable[[str], Optional[Markup]]:
+        """fetch() for blocking code running off the event loop (e.g. under run()), within the same limits."""
+        loop = asyncio.get_running_loop()
+
+        def fetch(url: str) -> Optional[Markup]:
+            return asyncio.run_coroutine_threadsafe(self.fetch(url), loop).result()
+
+        return fetch
+
+    async def run(self, func: Callable, *args):
+        """Run a CPU-bound helper (e.g. a parser) off the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class AsyncPrefetcher:
+    """Prefetcher for the asyncio engine; requests go through the AsyncFetcher's limits."""
+
+    def __init__(self, fetcher: AsyncFetcher, depth: int = 1):
+        self._fetcher = fetcher
+        self.depth = max(0, depth)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._ready: Dict[str, Optional[Markup]] = {}
+
+    def adopt(self, pages: Dict[str, Optional[Markup]]):
+        self._ready.update(pages)
+
+    def want(self, urls: Iterable[str]):
+        for u in urls:
+            if u not in self._pending and u not in self._ready and len(self._pending) < self.depth:
+                self._pending[u] = asyncio.ensure_future(self._fetcher.fetch(u))
+
+    async def get(self, url: str, then: Iterable[str] = ()) -> Optional[Markup]:
+        if url in self._ready:
+            self.want(then)
+            return self._ready.pop(url)
+        task = self._pending.pop(url, None)
+        self.want(then)
+        if task is None:
+            return await self._fetcher.fetch(url)
+        return await task
+
+    async def close(self):
+        tasks = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        for t in tasks:
+            t.cancel()
+        # collect them so a failed or cancelled prefetch doesn't warn as never retrieved
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,101 @@
+import codecs
+import re
+from typing import Optional, Tuple, Union
+from .metrics import get_metrics
+
+# a fetched page: bytes as received (usually a PageBytes) or already decoded text
+Markup = Union[str, bytes]
+
+SNIFF_BYTES = 4096
+_BOMS: Tuple[Tuple[bytes, str], ...] = (
+    # UTF-32 LE starts like UTF-16 LE, so it is checked first
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([^\"';\s]+)", re.IGNORECASE)
+# <meta charset="x"> and <meta http-equiv="Content-Type" content="text/html; charset=x">
+_META_CHARSET_RE = re.compile(rb"<meta\b[^>]*?charset\s*=\s*[\"']?\s*([a-zA-Z0-9_:.\-]+)", re.IGNORECASE)
+
+
+class PageBytes(bytes):
+    """A page body as received, tagged with the charset it was resolved to.
+
+    Parsers take it as is: BeautifulSoup gets the encoding instead of
+    guessing one and the JSON-LD scan decodes only the script blocks.
+    """
+
+    def __new__(cls, content: bytes, encoding: str):
+        self = super().__new__(cls, content)
+        self.encoding = encoding
+        return self
+
+    def __reduce__(self):
+        return PageBytes, (bytes(self), self.encoding)
+
+    def text(self) -> str:
+        return self.decode(self.encoding, errors="replace")
+
+
+def _lookup(name: Union[str, bytes, None]) -> Optional[str]:
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode("ascii", errors="ignore")
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def _detect(content: bytes) -> str:
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return "cp1252"
+    best = from_bytes(content).best()
+    return _lookup(best.encoding) if best is not None else "cp1252"
+
+
+def resolve_encoding(content: bytes, content_type: Optional[str] = None) -> str:
+    """Charset of a page, trying the cheap sources first.
+
+    In order: the Content-Type header, a byte order mark, a <meta> charset
+    in the first SNIFF_BYTES, valid UTF-8, and only then statistical
+    detection over the whole body (charset_normalizer, if installed).
+    """
+    metrics = get_metrics()
+    m = _HEADER_CHARSET_RE.search(content_type or "")
+    encoding = _lookup(m.group(1)) if m else None
+    if encoding:
+        metrics.count("charset_header")
+        return encoding
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            metrics.count("charset_bom")
+            return encoding
+    m = _META_CHARSET_RE.search(content, 0, SNIFF_BYTES)
+    encoding = _lookup(m.group(1)) if m else None
+    if encoding:
+        metrics.count("charset_meta")
+        # a meta tag we could read as ASCII can't really be UTF-16 (same rule as the HTML spec)
+        return "utf-8" if encoding.startswith("utf-16") else encoding
+    if content.isascii():
+        metrics.count("charset_utf8")
+        return "utf-8"
+    try:
+        content.decode("utf-8")
+    except UnicodeDecodeError:
+        metrics.count("charset_detected")
+        return _detect(content)
+    metrics.count("charset_utf8")
+    return "utf-8"
+
+
+def as_markup(content: bytes, encoding: str) -> Markup:
+    """The body as PageBytes, or decoded text for encodings byte-level parsing can't read (UTF-16/32)."""
+    if encoding.startswith(("utf-16", "utf-32")):
+        return content.decode(encoding, errors="replace")
+    return PageBytes(content, encoding)
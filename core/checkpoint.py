@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from .logging_config import get_logger
+from .metrics import get_metrics
+from .records import as_dict, product_from_dict, review_from_dict
+from .seen import MemorySeenStore
+
+logger = get_logger()
+
+
+class CrawlState:
+    """What a crawl had done when its checkpoint was last written."""
+
+    def __init__(self, start_url: str, seen_items: Optional[MemorySeenStore] = None,
+                 reviews_fetched: Optional[MemorySeenStore] = None):
+        self.url: Optional[str] = start_url
+        self.pages_scraped = 0
+        self.items: List[Dict] = []
+        self.seen_items = seen_items if seen_items is not None else MemorySeenStore()
+        self.reviews_fetched = reviews_fetched if reviews_fetched is not None else MemorySeenStore()
+
+    def pending_reviews(self) -> List[Dict]:
+        """Products recorded on a finished listing page whose reviews were never fetched."""
+        return [it for it in self.items if it.get("url") and it["url"] not in self.reviews_fetched]
+
+
+class Checkpoint:
+    """Append-only crawl journal, one JSON object per line.
+
+    A "page" line is written when a listing page has been parsed (its items,
+    before reviews) and a "reviews" line whenever a product page has been
+    handled, so each write only costs the size of what just changed. Loading
+    replays the lines; a torn last line from a crash is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = None
+        self._good_size: Optional[int] = None
+
+    def load(self, start_url: str, mode: str, state: Optional[CrawlState] = None) -> Optional[CrawlState]:
+        """Replay the journal into `state` (or a new CrawlState); None if there is nothing to resume."""
+        if not os.path.exists(self.path):
+            return None
+        if state is None:
+            state = CrawlState(start_url)
+        reviews: Dict[str, Optional[List[Dict]]] = {}
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn line")
+                    ev = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Checkpoint {self.path}: ignoring incomplete line")
+                    break
+                good += len(line)
+                kind = ev.get("t")
+                if kind == "start":
+                    if ev.get("start_url") != start_url or ev.get("mode") != mode:
+                        logger.warning(f"Checkpoint {self.path} belongs to another crawl "
+                                       f"({ev.get('start_url')}, mode={ev.get('mode')}); starting over")
+                        return None
+                elif kind == "page":
+                    state.pages_scraped += 1
+                    state.url = ev.get("next")
+                    items = ev.get("items", [])
+                    if mode == "shop":
+                        items = [product_from_dict(it) for it in items]
+                    state.items.extend(items)
+                    state.seen_items.add_many(it["url"] for it in items if it.get("url"))
+                elif kind == "reviews":
+                    reviews[ev["url"]] = ev.get("reviews")
+        for it in state.items:
+            u = it.get("url")
+            if u in reviews and reviews[u] is not None:
+                it["reviews"] = [review_from_dict(r) for r in reviews[u]] if mode == "shop" else reviews[u]
+        state.reviews_fetched.add_many(reviews)
+        self._good_size = good
+        logger.info(f"Resuming from {self.path}: {state.pages_scraped} pages, {len(state.items)} items, "
+                    f"{len(reviews)} product pages done")
+        return state
+
+    def open(self, start_url: str, mode: str, append: bool = False):
+        """Start writing; `append` continues the journal a resumed state was loaded from."""
+        self._f = open(self.path, "a" if append else "w", encoding="utf-8")
+        if append and self._good_size is not None:
+            # drop a line torn by the crash so new events don't run into it
+            self._f.truncate(self._good_size)
+        if not append:
+            self._write({"t": "start", "start_url": start_url, "mode": mode})
+
+    def _write(self, event: Dict):
+        with get_metrics().time("checkpoint"):
+            line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+            with self._lock:
+                self._f.write(line + "\n")
+                self._f.flush()
+
+    def record_page(self, url: str, next_url: Optional[str], items: List[Dict]):
+        self._write({"t": "page", "url": url, "next": next_url,
+                     "items": [{k: as_dict(v) for k, v in it.items() if k != "reviews"} for it in items]})
+
+    def record_reviews(self, product_url: str, reviews: Optional[List[Dict]]):
+        self._write({"t": "reviews", "url": product_url, "reviews": as_dict(reviews)})
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
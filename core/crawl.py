@@ -0,0 +1,623 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, FrozenSet, Iterable, Optional, Set, Tuple, TYPE_CHECKING
+from urllib.parse import urljoin
+from .charset import Markup
+from .checkpoint import Checkpoint, CrawlState
+from .document import ParsedPage, lxml_available
+from .incremental import ProductStore
+from .io_utils import RecordSink, open_sink
+from .ldjson import LDJSON_STRAINER
+from .logging_config import get_logger
+from .metrics import Metrics, MetricsServer, get_metrics
+from .network import MAX_BODY_SIZE, fetch_page, pool_stats, requests_session_with_retries
+from .parser import QUOTES_STRAINER, find_next_page, parse_items
+from .prefetch import Prefetcher
+from .progress import CrawlCancelled, ProgressReporter, cancellable_sleep, check_cancelled
+from .ratelimit import HostRateLimiter
+from .robots import RobotsCache
+from .seen import MemorySeenStore, open_seen_store
+from .shop import next_page_url, parse_products as parse_products_shop, parse_reviews
+from .urls import TRACKING_PARAMS, UrlNormalizer
+from .workers import HostSlots
+
+if TYPE_CHECKING:
+    from .parse_pool import ParsePool
+
+# the async engine, parse pool, page cache and catalog probe are imported when a run asks for them
+
+logger = get_logger()
+
+
+def _parse_review_page(html: Markup, features: str = "html.parser", max_reviews: Optional[int] = None) -> List[Dict]:
+    return parse_reviews(ParsedPage(html, parse_only=LDJSON_STRAINER, features=features), max_reviews)
+
+
+def _filter_new_products(items: List[Dict], page_url: str, seen_items: MemorySeenStore,
+                         urls: UrlNormalizer) -> List[Dict]:
+    """Absolutize and canonicalize product URLs, dropping products already seen.
+
+    Products fetched under the canonical URL only, so every later step uses
+    it["url"] as is.
+    """
+    metrics = get_metrics()
+    with metrics.time("dedupe"):
+        candidates: List[Dict] = []
+        raw_seen: List[bool] = []
+        for it in items:
+            purl = it.get("url")
+            if not purl:
+                continue
+            if not (purl.startswith("http://") or purl.startswith("https://")):
+                purl = urljoin(page_url, purl)
+            raw_seen.append(purl in urls)
+            it["url"] = urls.normalize(purl)
+            candidates.append(it)
+        # one batch lookup per page instead of one per product
+        known = seen_items.contains_many([it["url"] for it in candidates])
+        filtered: List[Dict] = []
+        new_urls: Set[str] = set()
+        for it, seen, same_string in zip(candidates, known, raw_seen):
+            if seen or it["url"] in new_urls:
+                if not same_string:
+                    # a variant of a known URL (tracking params, query order, ...) that would have been fetched again
+                    metrics.count("duplicates_prevented")
+                continue
+            new_urls.add(it["url"])
+            filtered.append(it)
+        seen_items.add_many(new_urls)
+    return filtered
+
+
+def _attach_reviews(fetch: Callable[[str], Optional[Markup]], items: List[Dict], reviews_fetched: MemorySeenStore,
+                    max_reviews_per_product: Optional[int], executor: Optional[ThreadPoolExecutor] = None,
+                    slots: Optional[HostSlots] = None, parse_pool: Optional["ParsePool"] = None,
+                    features: str = "html.parser", checkpoint: Optional[Checkpoint] = None,
+                    progress: Optional[ProgressReporter] = None, products: Optional[ProductStore] = None):
+    """Fetch product pages for `items` and attach their reviews in place.
+
+    With an executor the pages are fetched concurrently (at most
+    `slots.per_host` at a time per host); reviews are still attached in
+    listing order so the output does not depend on completion order. With a
+    parse pool the fetched pages are parsed as one batch on worker processes.
+    With a product store, products whose listing is unchanged since the last
+    run get their stored reviews and their page is not fetched.
+    """
+    todo: List[Dict] = []
+    reused: List[Dict] = []
+    for it in items:
+        purl = it.get("url")
+        if not purl or purl in reviews_fetched:
+            continue
+        reviews_fetched.add(purl)
+        revs = products.reviews_if_unchanged(it, max_reviews_per_product) if products is not None else None
+        if revs is not None:
+            it["reviews"] = revs
+            reused.append(it)
+            continue
+        todo.append(it)
+
+    def _fetch(it: Dict) -> Optional[Markup]:
+        if slots is not None:
+            with slots.slot(it["url"]):
+                return fetch(it["url"])
+        return fetch(it["url"])
+
+    pages = list(executor.map(_fetch, todo)) if executor is not None else [_fetch(it) for it in todo]
+    fetched = [(it, html) for it, html in zip(todo, pages) if html]
+    if parse_pool is not None:
+        jobs = [(html, features, max_reviews_per_product) for _, html in fetched]
+        results = parse_pool.map(_parse_review_page, jobs)
+    else:
+        results = [_parse_review_page(html, features, max_reviews_per_product) for _, html in fetched]
+    for (it, _), revs in zip(fetched, results):
+        it["reviews"] = revs
+        if products is not None:
+            products.remember(it, revs, max_reviews_per_product)
+    if checkpoint is not None:
+        for it in reused + todo:
+            checkpoint.record_reviews(it["url"], it.get("reviews"))
+    if progress is not None:
+        progress.reviews_done(len(reused) + len(todo))
+
+
+def _listings_ahead(url: str, pages_scraped: int, max_pages: int, depth: int) -> List[str]:
+    """Shop listing URLs after the one at `url` (page index `pages_scraped`), up to `depth` of them."""
+    return [next_page_url(url, pages_scraped + k) for k in range(1, depth + 1) if pages_scraped + k < max_pages]
+
+
+def _probe_catalog(fetch: Callable[[str], Optional[Markup]], url: str, pages_scraped: int, max_pages: int,
+                   width: int) -> Tuple[int, Dict[str, Optional[Markup]]]:
+    """Bound `max_pages` by where the shop catalog ends; also returns the listing pages fetched meanwhile."""
+    first = pages_scraped + 1
+
+    def page_url(n: int) -> str:
+        return url if n == first else next_page_url(url, n - 1)
+
+    def product_keys(html: Markup) -> FrozenSet[str]:
+        return frozenset(p["url"] for p in parse_products_shop(html, url) if p.get("url"))
+
+    from .fanout import CatalogProbe
+
+    probe = CatalogProbe(lambda n: fetch(page_url(n)), product_keys, width)
+    last = probe.find_last(first, max_pages)
+    return min(max_pages, last), {page_url(n): html for n, html in probe.pages.items() if first <= n <= last}
+
+
+async def _crawl_async(fetch: Callable[[str], Optional[Markup]], state: CrawlState, sink: RecordSink,
+                       max_pages: int, mode: str, max_reviews_per_product: Optional[int], concurrency: int,
+                       per_host: int, parse_pool: Optional["ParsePool"] = None, features: str = "html.parser",
+                       checkpoint: Optional[Checkpoint] = None, progress: Optional[ProgressReporter] = None,
+                       prefetch: int = 1, fanout: int = 0, urls: Optional[UrlNormalizer] = None,
+                       products: Optional[ProductStore] = None,
+                       fetch_product: Optional[Callable[[str], Optional[Markup]]] = None):
+    """asyncio variant of the crawl loop in scrape().
+
+    Listing pages are walked in order while product pages are fetched by a pool
+    of workers. Bounded queues sit between the listing walk and the fetchers and
+    between the fetchers and the review parser, so a slow stage holds back the
+    one feeding it instead of buffering pages in memory. With a parse pool one
+    parser per worker process drains whatever pages are waiting (up to a
+    chunk) and ships them to the pool together, so every worker stays busy.
+    Finished products are released to the sink
+    in listing order, whatever order their reviews arrive in. In shop mode the
+    next `prefetch` listing pages are requested while the current one is
+    processed; with `fanout` the end of the catalog is probed first and that
+    many listing pages are kept in flight. On cancellation
+    the products whose page was not fetched are never released, so the output
+    ends with the last complete product before them. Product pages are
+    fetched with `fetch_product` when given.
+    """
+    import asyncio
+    from .async_engine import AsyncFetcher, AsyncPrefetcher
+
+    fetcher = AsyncFetcher(fetch, concurrency=concurrency, per_host=per_host)
+    seen_items = state.seen_items
+    reviews_fetched = state.reviews_fetched
+    urls = urls or UrlNormalizer()
+    review_q: asyncio.Queue = asyncio.Queue(maxsize=fetcher.concurrency * 2)
+    parsers = parse_pool.workers if parse_pool is not None else 1
+    # room for a full chunk per parser, so the fetchers aren't held back while the chunks are in flight
+    chunk_room = parsers * parse_pool.chunk_size if parse_pool is not None else 0
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=max(fetcher.concurrency, chunk_room))
+    # products waiting for their reviews, in listing order; id()s of the finished ones
+    in_order: deque = deque()
+    finished = set()
+
+    def finish(it: Dict):
+        finished.add(id(it))
+        flushed = False
+        while in_order and id(in_order[0]) in finished:
+            head = in_order.popleft()
+            finished.discard(id(head))
+            sink.write(head)
+            flushed = True
+        if flushed:
+            sink.flush()
+
+    async def review_fetcher():
+        while True:
+            it = await review_q.get()
+            if it is None:
+                return
+            try:
+                product_html = await fetcher.fetch(it["url"], fetch_product)
+            except CrawlCancelled:
+                # keep draining the queue so the listing walk never blocks on it
+                continue
+            except Exception as e:
+                # a dead fetcher would leave the queue full and the listing walk stuck on it
+                logger.error(f"Could not fetch {it['url']}: {e}")
+                product_html = None
+            if progress is not None:
+                progress.reviews_done()
+            if product_html:
+                await parse_q.put((it, product_html))
+            else:
+                if checkpoint is not None:
+                    checkpoint.record_reviews(it["url"], None)
+                finish(it)
+
+    async def parse_pages(batch: List[Tuple[Dict, Markup]]) -> List[Optional[List[Dict]]]:
+        """Reviews of each fetched page, None for a page that could not be parsed."""
+        if parse_pool is not None:
+            jobs = [(h, features, max_reviews_per_product) for _, h in batch]
+            try:
+                return await asyncio.wrap_future(parse_pool.submit(_parse_review_page, jobs))
+            except Exception as e:
+                logger.error(f"Could not parse a chunk of {len(batch)} product pages, retrying one by one: {e}")
+        results: List[Optional[List[Dict]]] = []
+        for it, h in batch:
+            try:
+                results.append(await fetcher.run(_parse_review_page, h, features, max_reviews_per_product))
+            except Exception as e:
+                logger.error(f"Could not parse the reviews of {it['url']}: {e}")
+                results.append(None)
+        return results
+
+    async def review_parser():
+        chunk = parse_pool.chunk_size if parse_pool is not None else 1
+        done = False
+        while not done:
+            batch = [await parse_q.get()]
+            while batch[-1] is not None and len(batch) < chunk and not parse_q.empty():
+                batch.append(parse_q.get_nowait())
+            # one sentinel per parser is queued after every fetcher has finished, so it is always
+            # last; stopping at the first leaves the others to their parsers
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            results = await parse_pages(batch)
+            for (it, _), revs in zip(batch, results):
+                if revs is not None:
+                    it["reviews"] = revs
+                    if products is not None:
+                        products.remember(it, revs, max_reviews_per_product)
+                if checkpoint is not None:
+                    checkpoint.record_reviews(it["url"], revs)
+                finish(it)
+
+    async def queue_products(items: List[Dict]):
+        for it in items:
+            in_order.append(it)
+        for it in items:
+            if it["url"] in reviews_fetched:
+                finish(it)
+                continue
+            reviews_fetched.add(it["url"])
+            revs = products.reviews_if_unchanged(it, max_reviews_per_product) if products is not None else None
+            if revs is not None:
+                # unchanged since the last run: no page to fetch
+                it["reviews"] = revs
+                if checkpoint is not None:
+                    checkpoint.record_reviews(it["url"], revs)
+                if progress is not None:
+                    progress.reviews_done()
+                finish(it)
+                continue
+            await review_q.put(it)
+
+    fetchers = [asyncio.create_task(review_fetcher()) for _ in range(fetcher.concurrency)] if mode == "shop" else []
+    parser_tasks = [asyncio.create_task(review_parser()) for _ in range(parsers)] if mode == "shop" else []
+    stages = fetchers + parser_tasks
+    failures: List[BaseException] = []
+    # the task that would wait forever on a stage that stopped: the listing walk, then the drain
+    waiter: List[Optional[asyncio.Task]] = [asyncio.current_task()]
+
+    def stage_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+            if waiter[0] is not None:
+                waiter[0].cancel()
+
+    for task in stages:
+        task.add_done_callback(stage_done)
+    ahead = AsyncPrefetcher(fetcher, max(prefetch, fanout) if mode == "shop" else 0)
+    url = state.url
+    pages_scraped = state.pages_scraped
+    last_keys = None   # product URLs of the previous listing page
+    try:
+        if mode == "shop" and fanout > 0 and url and pages_scraped < max_pages:
+            # the probe blocks on a thread of its own; its requests still queue for the fetcher's host slots
+            max_pages, probed = await fetcher.run(_probe_catalog, fetcher.blocking_fetch(), url, pages_scraped,
+                                                  max_pages, fanout)
+            ahead.adopt(probed)
+        if state.items:
+            # checkpointed items missing from the output; some still need their reviews
+            backlog, state.items = state.items, []
+            if mode == "shop":
+                await queue_products(backlog)
+            else:
+                for it in backlog:
+                    sink.write(it)
+        while url and pages_scraped < max_pages:
+            html = await ahead.get(url, then=_listings_ahead(url, pages_scraped, max_pages, ahead.depth))
+            if html is None:
+                logger.warning(f"Skipping page: {url}")
+                break
+            page = ParsedPage(html, url, parse_only=LDJSON_STRAINER if mode == "shop" else QUOTES_STRAINER,
+                              features=features)
+            if mode == "shop":
+                found = await fetcher.run(parse_products_shop, page, url)
+                items = _filter_new_products(found, url, seen_items, urls)
+            else:
+                items = await fetcher.run(parse_items, page, url)
+            logger.info(f"Extracted {len(items)} items from {url}")
+            pages_scraped += 1
+            if progress is not None:
+                progress.page_done()
+
+            if mode == "shop":
+                # the end of the catalog is an empty page (or one repeating the last), not a page whose
+                # products were all seen before, e.g. by an earlier run sharing the seen store
+                page_keys = frozenset(it.get("url") for it in found)
+                catalog_ended = not found or page_keys == last_keys
+                last_keys = page_keys
+                next_url = next_page_url(url, pages_scraped) if not catalog_ended else None
+            else:
+                next_url = find_next_page(page, url)
+            if checkpoint is not None:
+                checkpoint.record_page(url, next_url, items)
+
+            if mode == "shop":
+                if catalog_ended:
+                    logger.info("No new page of the catalog. Stopping." if found else "No items on this page. Stopping.")
+                    break
+                await queue_products(items)
+            else:
+                for it in items:
+                    sink.write(it)
+                sink.flush()
+                if not next_url:
+                    logger.info("No next page. Stopping.")
+                    break
+            url = next_url
+    finally:
+        waiter[0] = None
+        # anything prefetched past the last page is not needed
+        await ahead.close()
+
+        async def drain():
+            for _ in fetchers:
+                await review_q.put(None)
+            await asyncio.gather(*fetchers)
+            for _ in parser_tasks:
+                await parse_q.put(None)
+            await asyncio.gather(*parser_tasks)
+
+        if stages and not failures:
+            waiter[0] = asyncio.ensure_future(drain())
+            try:
+                await waiter[0]
+            except BaseException:
+                # cancelled by stage_done, or the stage's own error surfacing through the drain
+                if not failures:
+                    raise
+        if failures:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+        fetcher.close()
+        if failures:
+            raise failures[0]
+
+
+def _crawl_sync(fetch: Callable[[str], Optional[Markup]], state: CrawlState, sink: RecordSink,
+                max_pages: int, mode: str, max_reviews_per_product: Optional[int], per_host: int, review_workers: int,
+                parse_pool: Optional["ParsePool"], features: str = "html.parser",
+                checkpoint: Optional[Checkpoint] = None, progress: Optional[ProgressReporter] = None,
+                prefetch: int = 1, fanout: int = 0, urls: Optional[UrlNormalizer] = None,
+                products: Optional[ProductStore] = None,
+                fetch_product: Optional[Callable[[str], Optional[Markup]]] = None):
+    fetch_product = fetch_product or fetch
+    review_pool = ThreadPoolExecutor(max_workers=review_workers, thread_name_prefix="reviews") if review_workers > 1 else None
+    # review workers, prefetch threads and the catalog probe all count against the per-host limit
+    slots = HostSlots(per_host)
+
+    def limited(u: str) -> Optional[Markup]:
+        with slots.slot(u):
+            return fetch(u)
+
+    url = state.url
+    pages_scraped = state.pages_scraped
+    last_keys = None   # product URLs of the previous listing page
+    seen_items = state.seen_items            # canonical product URLs already added to CSV list
+    reviews_fetched = state.reviews_fetched  # canonical product URLs already fetched for reviews
+    urls = urls or UrlNormalizer()
+    # next listing pages are fetched while this page's product pages are
+    ahead = Prefetcher(limited, max(prefetch, fanout) if mode == "shop" else 0)
+
+    try:
+        if state.items:
+            # checkpointed items missing from the output; some still need their reviews
+            if mode == "shop":
+                _attach_reviews(fetch_product, state.pending_reviews(), reviews_fetched, max_reviews_per_product,
+                                review_pool, slots, parse_pool, features, checkpoint, progress, products)
+            for it in state.items:
+                sink.write(it)
+            sink.flush()
+            state.items = []
+        if mode == "shop" and fanout > 0 and url and pages_scraped < max_pages:
+            # find where the catalog ends, then keep `fanout` listing pages in flight up to there
+            max_pages, probed = _probe_catalog(limited, url, pages_scraped, max_pages, fanout)
+            ahead.adopt(probed)
+        while url and pages_scraped < max_pages:
+            html = ahead.get(url, then=_listings_ahead(url, pages_scraped, max_pages, ahead.depth))
+            if html is None:
+                logger.warning(f"Skipping page: {url}")
+                break
+            # parsed once, shared by the item and next-link extractors
+            page = ParsedPage(html, url, parse_only=LDJSON_STRAINER if mode == "shop" else QUOTES_STRAINER,
+                              features=features)
+            if mode == "shop":
+                found = parse_products_shop(page, url)
+                # filter duplicates by canonical URL
+                items = _filter_new_products(found, url, seen_items, urls)
+            else:
+                items = parse_items(page, url)
+            logger.info(f"Extracted {len(items)} items from {url}")
+            pages_scraped += 1
+            if progress is not None:
+                progress.page_done()
+
+            # finding the next page (if exists)
+            if mode == "shop":
+                # the end of the catalog is an empty page (or one repeating the last), not a page whose
+                # products were all seen before, e.g. by an earlier run sharing the seen store
+                page_keys = frozenset(it.get("url") for it in found)
+                catalog_ended = not found or page_keys == last_keys
+                last_keys = page_keys
+                next_url = next_page_url(url, pages_scraped) if not catalog_ended else None
+            else:
+                next_url = find_next_page(page, url)
+            if checkpoint is not None:
+                checkpoint.record_page(url, next_url, items)
+
+            if mode == "shop":
+                if catalog_ended:
+                    logger.info("No new page of the catalog. Stopping." if found else "No items on this page. Stopping.")
+                    break
+                # fetch reviews for product pages and attach to items
+                _attach_reviews(fetch_product, items, reviews_fetched, max_reviews_per_product, review_pool, slots,
+                                parse_pool, features, checkpoint, progress, products)
+            # the page is complete: put it on disk now rather than at the end of the run
+            for it in items:
+                sink.write(it)
+            sink.flush()
+            if mode != "shop" and not next_url:
+                logger.info("No next page. Stopping.")
+                break
+            url = next_url
+    finally:
+        ahead.close()
+        if review_pool is not None:
+            review_pool.shutdown()
+
+
+def _report_metrics(metrics: Metrics, path: Optional[str]):
+    summary = metrics.summary()
+    stages = sorted(summary["stages"].items(), key=lambda kv: kv[1]["total_s"], reverse=True)
+    for name, st in stages:
+        logger.info(f"Stage {name}: {st['count']} x, {st['total_s']:.3f} s total, "
+                    f"p50 {st['p50_ms']} ms, p99 {st['p99_ms']} ms")
+    c = summary["counters"]
+    logger.info(f"HTTP {summary['http_status']}, {c.get('bytes_in', 0)} bytes in, {c.get('errors', 0)} errors")
+    if path:
+        metrics.write_json(path)
+        logger.info(f"Metrics summary written to {path}")
+
+
+def scrape(start_url: str, output: str, delay: float = 1.0, max_pages: int = 50, mode: str = "quotes", max_reviews_per_product: Optional[int] = None,
+           engine: str = "sync", concurrency: int = 8, per_host: int = 4, review_workers: int = 1,
+           parse_workers: int = 0, parse_chunk_size: int = 8, html_parser: str = "html.parser",
+           cache_dir: Optional[str] = None, cache_max_size: int = 256 * 1024 ** 2,
+           checkpoint_path: Optional[str] = None, resume: bool = False, output_format: Optional[str] = None,
+           max_rate: float = 5.0, min_rate: float = 0.1, seen_store: str = "memory", seen_db: Optional[str] = None,
+           bloom_capacity: int = 0, metrics_json: Optional[str] = None, metrics_port: Optional[int] = None,
+           progress: Optional[Callable[[Dict], None]] = None, cancel: Optional[threading.Event] = None,
+           prefetch: int = 1, fanout: int = 0, pool_size: int = 0, connect_timeout: float = 5.0,
+           read_timeout: float = 10.0, max_body_size: int = MAX_BODY_SIZE, stop_after_ldjson: bool = False,
+           strip_params: Iterable[str] = TRACKING_PARAMS, incremental_db: Optional[str] = None,
+           full_refresh: bool = False):
+    """Crawl from `start_url` and write what is found to `output`.
+
+    `progress` is called with a dict of counters after every listing page
+    (see core.progress.ProgressReporter). Setting `cancel` stops the crawl
+    before its next request and wakes up any rate-limit wait; records that
+    were complete by then are flushed to the output as usual.
+
+    `pool_size` is the number of kept-alive connections per host; 0 sizes
+    it to the most requests the chosen options can have in flight.
+    Responses over `max_body_size` bytes (0 = no limit) or not HTML are
+    skipped; in shop mode `stop_after_ldjson` stops reading a product page
+    at </head> when its JSON-LD there describes the product (listing pages
+    are always read in full). Product URLs are deduplicated
+    and fetched in canonical form, without the `strip_params` query
+    parameters (see core.urls.UrlNormalizer). With `incremental_db`, shop
+    products whose listing price, availability, rating and review count are
+    unchanged since the run that stored them keep their stored reviews
+    instead of having their page fetched; `full_refresh` fetches them all.
+    """
+    metrics = get_metrics()
+    metrics.reset()
+    workers = concurrency if engine == "async" else review_workers
+    # review workers / async slots plus the listing pages being prefetched
+    in_flight = workers + (max(prefetch, fanout) if mode == "shop" else 0)
+    session = requests_session_with_retries(pool_size=pool_size or max(10, in_flight),
+                                            connect_timeout=connect_timeout, read_timeout=read_timeout)
+    robots = RobotsCache(session)
+    if not robots.can_fetch(start_url):
+        logger.error("Conform robots.txt, scraping isn't allowed for thi URL. Stopping.")
+        return
+    # `delay` is only the starting pace now; each host then speeds up or backs off on its own,
+    # never faster than robots.txt allows
+    limiter = HostRateLimiter(initial_rate=1.0 / delay if delay > 0 else max_rate, min_rate=min_rate,
+                              max_rate=max_rate, min_interval=robots.min_interval, sleep=cancellable_sleep(cancel))
+    if html_parser == "lxml" and not lxml_available():
+        logger.warning("lxml is not installed, falling back to html.parser")
+        html_parser = "html.parser"
+
+    cache = None
+    if cache_dir:
+        from .http_cache import ResponseCache
+        cache = ResponseCache(cache_dir, cache_max_size)
+    metrics_server = MetricsServer(metrics, metrics_port) if metrics_port else None
+    if metrics_server is not None:
+        logger.info(f"Metrics at {metrics_server.url}")
+
+    def fetch(u: str, head_only: bool = False) -> Optional[Markup]:
+        check_cancelled(cancel)
+        # every URL goes through robots.txt; rules are cached per host
+        if not robots.can_fetch(u):
+            logger.warning(f"robots.txt disallows {u}, skipping")
+            return None
+        return fetch_page(session, u, cache=cache, limiter=limiter, max_bytes=max_body_size,
+                          stop_after_ldjson=head_only)
+
+    def fetch_product(u: str) -> Optional[Markup]:
+        # never listings: a Product in the head says nothing of the products further down
+        return fetch(u, head_only=stop_after_ldjson and mode == "shop")
+
+    if resume and not checkpoint_path:
+        checkpoint_path = f"{output}.checkpoint.jsonl"
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+    state = CrawlState(start_url, open_seen_store(seen_store, "items", seen_db, bloom_capacity),
+                       open_seen_store(seen_store, "reviews", seen_db, bloom_capacity))
+    resumed = checkpoint is not None and resume and checkpoint.load(start_url, mode, state) is not None
+    if checkpoint is not None:
+        checkpoint.open(start_url, mode, append=resumed)
+    sink = open_sink(output, mode, output_format)
+    if resumed:
+        # whatever the previous run already wrote stays; only the rest is written again
+        state.items = state.items[sink.resume():]
+
+    urls = UrlNormalizer(strip_params)
+    products = ProductStore(incremental_db, full_refresh) if incremental_db and mode == "shop" else None
+    parse_pool = None
+    if parse_workers > 0 and mode == "shop":
+        from .parse_pool import ParsePool
+        parse_pool = ParsePool(parse_workers, parse_chunk_size)
+    reporter = ProgressReporter(progress, max_pages, lambda: sink.written, state.pages_scraped) if progress else None
+    try:
+        if engine == "async":
+            import asyncio
+            asyncio.run(_crawl_async(fetch, state, sink, max_pages, mode, max_reviews_per_product,
+                                     concurrency, per_host, parse_pool, html_parser, checkpoint, reporter, prefetch, fanout, urls, products,
+                                     fetch_product))
+        else:
+            _crawl_sync(fetch, state, sink, max_pages, mode, max_reviews_per_product,
+                        per_host, review_workers, parse_pool, html_parser, checkpoint, reporter, prefetch, fanout, urls, products,
+                        fetch_product)
+    except CrawlCancelled:
+        logger.warning("Scraping cancelled; saving what was complete")
+    finally:
+        sink.close()
+        state.seen_items.close()
+        state.reviews_fetched.close()
+        for host, rate in limiter.rates().items():
+            logger.info(f"Final request rate for {host}: {rate:.2f} req/s")
+        if checkpoint is not None:
+            checkpoint.close()
+        if parse_pool is not None:
+            parse_pool.close()
+        if cache is not None:
+            logger.info(f"HTTP cache: {cache.hits} pages not modified, {cache.stored} stored")
+            cache.close()
+        if products is not None:
+            products.report()
+            products.close()
+        if mode == "shop":
+            logger.info(f"URL normalizer: {metrics.counters['duplicates_prevented']} duplicate product fetches "
+                        f"prevented, memo hit rate {urls.hit_rate():.0%}")
+        conns = pool_stats(session)
+        metrics.count("connections_opened", conns["connections"])
+        logger.info(f"Connections: {conns['connections']} opened for {conns['requests']} requests "
+                    f"({conns['reuse_rate']:.0%} reused)")
+        _report_metrics(metrics, metrics_json)
+        if metrics_server is not None:
+            metrics_server.close()
+        if reporter is not None:
+            reporter.finish()
+    if sink.written == 0:
+        logger.info("I didn't find any items to save.")
@@ -0,0 +1,58 @@
+from typing import Iterable, Optional, Union
+from bs4 import BeautifulSoup, SoupStrainer
+from .charset import Markup
+from .metrics import get_metrics
+
+
+def lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def class_strainer(classes: Iterable[str]) -> SoupStrainer:
+    """SoupStrainer keeping only elements (with their subtrees) that carry one of `classes`."""
+    wanted = frozenset(classes)
+
+    def _match(value) -> bool:
+        if not value:
+            return False
+        tokens = value.split() if isinstance(value, str) else value
+        return not wanted.isdisjoint(tokens)
+
+    return SoupStrainer(class_=_match)
+
+
+class ParsedPage:
+    """A fetched page parsed at most once and shared by every extractor.
+
+    `parse_only` limits the tree to the parts the extractors declared they
+    need; it must cover all of them. The tree is built lazily, so extractors
+    that can work on the raw markup (JSON-LD) never pay for it.
+    """
+
+    def __init__(self, html: Markup, url: str = "", parse_only: Optional[SoupStrainer] = None,
+                 features: str = "html.parser"):
+        self.html = html
+        self.url = url
+        self.parse_only = parse_only
+        self.features = features
+        self._soup: Optional[BeautifulSoup] = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            with get_metrics().time("parse.html"):
+                # PageBytes know their charset; plain bytes are left to BeautifulSoup to guess
+                self._soup = BeautifulSoup(self.html, self.features, parse_only=self.parse_only,
+                                           from_encoding=getattr(self.html, "encoding", None))
+        return self._soup
+
+
+def as_page(html: Union[Markup, ParsedPage], url: str = "", parse_only: Optional[SoupStrainer] = None) -> ParsedPage:
+    """Wrap raw markup in a ParsedPage, or pass an existing one through untouched."""
+    if isinstance(html, ParsedPage):
+        return html
+    return ParsedPage(html, url, parse_only=parse_only)
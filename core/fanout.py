@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterable, Optional
+from .charset import Markup
+from .logging_config import get_logger
+
+logger = get_logger()
+
+
+class CatalogProbe:
+    """Find the last page of a ?page=N catalog with a few concurrent rounds.
+
+    `fetch(n)` returns the markup of listing page n (None on failure) and
+    `product_keys(html)` the set of product URLs on it. A page is past the
+    end when it is empty or failed, or when it repeats the content served
+    for out-of-range page numbers by sites that clamp them to the last page
+    or fall back to the first one. That content is only recognised on two
+    consecutive pages with the same products, and only its lowest-numbered
+    occurrence counts as in range: with clamping that is the last page,
+    with a fallback it is page 1 (probed too when the crawl resumes past
+    it), so neither `first` nor the pages between it and the real end are
+    taken for the end. A clamped last page listing the same products as
+    an earlier page can't be told apart from a fallback to that page.
+
+    The first round probes pages first, first+1, first+2, first+4, ...
+    and the last two pages allowed at once; later rounds split the remaining gap into
+    `width` points, so the end of a catalog of P pages is found in about
+    1 + log(P) / log(width + 1) round trips. Fetched pages are kept in
+    `pages` so the crawl does not request them again.
+    """
+
+    def __init__(self, fetch: Callable[[int], Optional[Markup]], product_keys: Callable[[Markup], FrozenSet[str]],
+                 width: int = 8):
+        self._fetch = fetch
+        self._product_keys = product_keys
+        self.width = max(1, width)
+        self.pages: Dict[int, Optional[Markup]] = {}
+        self._keys: Dict[int, Optional[FrozenSet[str]]] = {}
+        self._terminal: Optional[FrozenSet[str]] = None
+
+    def _load(self, pool: ThreadPoolExecutor, numbers: Iterable[int]):
+        todo = sorted(n for n in set(numbers) if n not in self._keys)
+        for n, html in zip(todo, pool.map(self._fetch, todo)):
+            self.pages[n] = html
+            self._keys[n] = self._product_keys(html) if html else None
+        if self._terminal is None:
+            for a in sorted(self._keys):
+                # only neighbours: two far-apart pages may legitimately list the same products
+                if self._keys[a] and self._keys.get(a + 1) == self._keys[a]:
+                    self._terminal = self._keys[a]
+                    break
+        if self._terminal is not None and 1 not in self._keys:
+            # the content of a fallback is page 1's, which a resumed crawl would not have probed
+            self._load(pool, [1])
+
+    def _stops(self, n: int, first: int) -> bool:
+        # the first page is never taken for the repeated content: a fallback to page 1 serves it too
+        keys = self._keys[n]
+        return n >= first and (not keys or (n > first and keys == self._terminal))
+
+    def _repeats(self, n: int) -> bool:
+        """Page n shows the repeated content and a lower page already did, so it is past the end."""
+        keys = self._keys[n]
+        return keys == self._terminal and any(m < n and self._keys[m] == keys for m in self._keys)
+
+    def find_last(self, first: int, max_page: int) -> int:
+        """Number of the last page worth crawling, between `first` and `max_page`."""
+        with ThreadPoolExecutor(max_workers=self.width, thread_name_prefix="probe") as pool:
+            step = 1
+            probes = [first]
+            while first + step <= max_page:
+                probes.append(first + step)
+                step *= 2
+            # two pages at the far end reveal a site that clamps page numbers
+            probes += [max_page - 1, max_page]
+            self._load(pool, [n for n in probes if n >= first])
+            known = sorted(self._keys)
+            hi = next((n for n in known if self._stops(n, first)), None)
+            if hi is None:
+                return max_page
+            lo = max((n for n in known if first <= n < hi), default=first - 1)
+            rounds = 1
+            while hi - lo > 1:
+                gap = hi - lo
+                count = min(self.width, gap - 1)
+                points = sorted({lo + (gap * i) // (count + 1) for i in range(1, count + 1)} - {lo, hi})
+                self._load(pool, points)
+                rounds += 1
+                # the repeated content may only show up now; re-check the pages below hi too
+                hi = next(n for n in sorted(self._keys) if self._stops(n, first) or n == hi)
+                lo = max((n for n in self._keys if first <= n < hi), default=first - 1)
+        # with clamping, the first page showing the repeated content is the real last page;
+        # with a fallback, that content already showed up on the first page
+        last = hi if self._keys[hi] and not self._repeats(hi) else hi - 1
+        logger.info(f"Catalog ends at page {max(last, first)} (found in {rounds} rounds, "
+                    f"{len(self._keys)} pages probed)")
+        return max(last, first)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from .charset import Markup, as_markup, resolve_encoding
+from .logging_config import get_logger
+
+logger = get_logger()
+
+EVICT_BATCH = 64
+
+
+class ResponseCache:
+    """On-disk page cache revalidated with ETag / Last-Modified.
+
+    Bodies are stored as files under `directory`; an SQLite index keeps their
+    validators, size and last use. Only responses carrying a validator are
+    kept, since anything else could never be revalidated. When the total
+    size goes over `max_size` the least recently used bodies are evicted.
+    """
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 ** 2):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0       # 304 responses served from disk
+        self.stored = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, encoding TEXT,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._db.commit()
+        # kept up to date on every store / forget so eviction never has to add up the table
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        with self._lock:
+            # the limit may have been lowered since the last run
+            self._evict()
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        with self._lock:
+            row = self._db.execute("SELECT etag, last_modified FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def load(self, url: str) -> Optional[Markup]:
+        """Cached body of `url` (as fetch_page returns it), or None if it is gone."""
+        with self._lock:
+            row = self._db.execute("SELECT encoding FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._path(url), "rb") as f:
+                body = f.read()
+        except OSError:
+            self.forget(url)
+            return None
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        self.hits += 1
+        return as_markup(body, row[0] or resolve_encoding(body))
+
+    def store(self, url: str, body: bytes, encoding: Optional[str], etag: Optional[str], last_modified: Optional[str]):
+        if not (etag or last_modified) or len(body) > self.max_size:
+            return
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total -= self._size_of(url)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, encoding, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, len(body), time.time()),
+            )
+            self._total += len(body)
+            self._db.commit()
+            self._evict()
+        self.stored += 1
+
+    def forget(self, url: str):
+        with self._lock:
+            self._total -= self._size_of(url)
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._db.commit()
+
+    def _size_of(self, url: str) -> int:
+        # caller holds self._lock
+        row = self._db.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else 0
+
+    def _evict(self):
+        # caller holds self._lock
+        if self._total <= self.max_size:
+            return
+        evicted = 0
+        while self._total > self.max_size:
+            # least recently used first, a batch at a time off the last_used index
+            batch = self._db.execute("SELECT url, size FROM entries ORDER BY last_used LIMIT ?",
+                                     (EVICT_BATCH,)).fetchall()
+            if not batch:
+                self._total = 0
+                break
+            for url, size in batch:
+                if self._total <= self.max_size:
+                    break
+                try:
+                    os.remove(self._path(url))
+                except OSError:
+                    pass
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._total -= size
+                evicted += 1
+        self._db.commit()
+        logger.debug(f"HTTP cache: evicted {evicted} entries, {self._total} bytes left")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
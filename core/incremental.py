@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from .logging_config import get_logger
+from .metrics import get_metrics
+from .records import Review, as_dict, review_from_dict
+from .seen import fingerprint
+
+logger = get_logger()
+
+# what the listing JSON-LD says about a product; a new review or a price change shows up here
+FINGERPRINT_FIELDS = ("price", "currency", "availability", "rating", "review_count")
+COMMIT_EVERY = 100
+
+
+def listing_fingerprint(item: Dict, max_reviews: Optional[int] = None) -> Optional[int]:
+    """Fingerprint of a product's listing fields (and the review limit), or None if the listing has none of them."""
+    values = [item.get(f) for f in FINGERPRINT_FIELDS]
+    if all(v is None or v == "" for v in values):
+        return None
+    return fingerprint("\x1f".join("" if v is None else str(v) for v in values) + f"\x1f{max_reviews}")
+
+
+class ProductStore:
+    """Listing fingerprints and reviews of every product crawled, kept across runs.
+
+    Keyed by canonical product URL in an SQLite file. When a product's
+    listing fields are the same as when its reviews were stored, the
+    reviews are reused instead of fetching the product page again; with
+    `full_refresh` every product page is fetched and the store rewritten.
+    Products whose listing carries none of FINGERPRINT_FIELDS are always
+    fetched, since nothing would tell a change apart.
+    """
+
+    def __init__(self, path: str, full_refresh: bool = False):
+        import sqlite3
+
+        self.path = path
+        self.full_refresh = full_refresh
+        self.hits = 0         # product pages skipped
+        self.new = 0          # not in the store yet
+        self.changed = 0      # listing fields differ (or no fingerprint)
+        self.refreshed = 0    # unchanged but fetched for --full-refresh
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            " url TEXT PRIMARY KEY, fp INTEGER NOT NULL, reviews TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def reviews_if_unchanged(self, item: Dict, max_reviews: Optional[int] = None) -> Optional[List[Review]]:
+        """Stored reviews of `item` if its listing fields haven't changed, else None (fetch the page)."""
+        fp = listing_fingerprint(item, max_reviews)
+        with self._lock:
+            row = self._db.execute("SELECT fp, reviews FROM products WHERE url = ?", (item["url"],)).fetchone()
+        metrics = get_metrics()
+        if row is None:
+            self.new += 1
+        elif fp is None or row[0] != fp:
+            self.changed += 1
+        elif self.full_refresh:
+            self.refreshed += 1
+        else:
+            self.hits += 1
+            metrics.count("incremental_hits")
+            return [review_from_dict(r) for r in json.loads(row[1])]
+        metrics.count("incremental_misses")
+        return None
+
+    def remember(self, item: Dict, reviews: List[Review], max_reviews: Optional[int] = None):
+        fp = listing_fingerprint(item, max_reviews)
+        if fp is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO products (url, fp, reviews, updated) VALUES (?, ?, ?, ?)",
+                (item["url"], fp, json.dumps(as_dict(reviews), ensure_ascii=False), time.time()),
+            )
+            self._uncommitted += 1
+            # a lost tail only means those pages get fetched again next run
+            if self._uncommitted >= COMMIT_EVERY:
+                self._db.commit()
+                self._uncommitted = 0
+
+    def report(self):
+        fetched = self.new + self.changed + self.refreshed
+        total = self.hits + fetched
+        rate = self.hits / total if total else 0.0
+        logger.info(f"Incremental: {self.hits} product pages unchanged and skipped, {fetched} fetched "
+                    f"({self.new} new, {self.changed} changed, {self.refreshed} refreshed); hit rate {rate:.0%}")
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -1,6 +1,11 @@
 import csv
-from typing import List, Dict
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import IO, List, Dict, Optional, Set
 from .logging_config import get_logger
+from .metrics import get_metrics
+from .records import Product, as_dict
 
 logger = get_logger()
 
@@ -36,30 +41,195 @@ def append_reviews_txt(filename: str, reviews: List[Dict]):
             f.write("---\n")
 
 
+def _write_product_txt(f: IO[str], p: Dict):
+    title = p.get("title") or ""
+    brand = p.get("brand") or ""
+    price = p.get("price")
+    currency = p.get("currency") or ""
+    rating = p.get("rating")
+    url = p.get("url") or ""
+    f.write(f"Product: {title}\n")
+    f.write(f"Brand: {brand}\n")
+    f.write(f"Price: {price} {currency}\n")
+    if rating is not None:
+        f.write(f"Stars: {rating}/5\n")
+    f.write(f"URL: {url}\n")
+    f.write("Reviews:\n")
+    for r in p.get("reviews", []) or []:
+        author = r.get("author") or ""
+        rr = r.get("rating")
+        body = (r.get("body") or "").strip()
+        f.write(f"- Author: {author}\n")
+        if rr is not None:
+            f.write(f"  Rating: {rr}\n")
+        if body:
+            f.write(f"  {body}\n")
+        f.write("  ---\n")
+    f.write("====\n")
+
+
 def save_products_with_reviews_txt(filename: str, products: List[Dict]):
     with open(filename, "w", encoding="utf-8") as f:
         for p in products:
-            title = p.get("title") or ""
-            brand = p.get("brand") or ""
-            price = p.get("price")
-            currency = p.get("currency") or ""
-            rating = p.get("rating")
-            url = p.get("url") or ""
-            f.write(f"Product: {title}\n")
-            f.write(f"Brand: {brand}\n")
-            f.write(f"Price: {price} {currency}\n")
-            if rating is not None:
-                f.write(f"Stars: {rating}/5\n")
-            f.write(f"URL: {url}\n")
-            f.write("Reviews:\n")
-            for r in p.get("reviews", []) or []:
-                author = r.get("author") or ""
-                rr = r.get("rating")
-                body = (r.get("body") or "").strip()
-                f.write(f"- Author: {author}\n")
-                if rr is not None:
-                    f.write(f"  Rating: {rr}\n")
-                if body:
-                    f.write(f"  {body}\n")
-                f.write("  ---\n")
-            f.write("====\n")
+            _write_product_txt(f, p)
+
+
+class RecordSink(ABC):
+    """Writes records to a file as they are produced instead of at the end.
+
+    The file is opened on the first record, so a run that finds nothing
+    leaves no file behind. With `key` set, records whose key was already
+    written are dropped; only the keys are kept in memory. Call flush()
+    whenever a batch is complete so partial results are usable on disk.
+    """
+
+    def __init__(self, path: str, key: Optional[str] = None):
+        self.path = path
+        self.key = key
+        self.written = 0
+        self._keys: Set[str] = set()
+        self._f: Optional[IO[str]] = None
+        self._append = False
+
+    def resume(self) -> int:
+        """Continue an existing file; returns how many records it already holds."""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._append = True
+            self._load_existing()
+        return self.written
+
+    @abstractmethod
+    def _load_existing(self):
+        """Count the records of the file being resumed and note their keys."""
+
+    def _open(self):
+        self._f = open(self.path, "a" if self._append else "w", newline="", encoding="utf-8")
+
+    @abstractmethod
+    def _write(self, record: Dict):
+        """Append one record to the open file."""
+
+    def write(self, record: Dict) -> bool:
+        if self.key is not None:
+            k = record.get(self.key)
+            if k:
+                if k in self._keys:
+                    return False
+                self._keys.add(k)
+        with get_metrics().time("write"):
+            if self._f is None:
+                self._open()
+            self._write(record)
+        self.written += 1
+        return True
+
+    def flush(self):
+        if self._f is not None:
+            with get_metrics().time("write"):
+                self._f.flush()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+            logger.info(f"Saved {self.written} rows in {self.path}")
+
+
+class CsvSink(RecordSink):
+    """CSV with the given columns, or those of the first record; nested lists are stored as JSON.
+
+    A resumed file keeps the columns of its header. Fields outside the
+    columns can't be written; each one is reported once.
+    """
+
+    def __init__(self, path: str, key: Optional[str] = None, fieldnames: Optional[List[str]] = None):
+        super().__init__(path, key)
+        self._writer: Optional[csv.DictWriter] = None
+        self._fieldnames: Optional[List[str]] = list(fieldnames) if fieldnames is not None else None
+        self._dropped: Set[str] = set()
+
+    def _load_existing(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            self._fieldnames = list(reader.fieldnames or [])
+            for row in reader:
+                self.written += 1
+                if self.key is not None and row.get(self.key):
+                    self._keys.add(row[self.key])
+
+    def _write(self, record: Dict):
+        if self._writer is None:
+            if self._fieldnames is None:
+                self._fieldnames = list(record.keys())
+            self._writer = csv.DictWriter(self._f, fieldnames=self._fieldnames, extrasaction="ignore")
+            if not self._append:
+                self._writer.writeheader()
+        extra = [k for k in record.keys() if k not in self._writer.fieldnames and k not in self._dropped]
+        if extra:
+            self._dropped.update(extra)
+            get_metrics().count("csv_fields_dropped", len(extra))
+            logger.warning(f"{self.path} has no column for {', '.join(extra)}; those values are not saved")
+        row = {k: json.dumps(as_dict(v), ensure_ascii=False) if isinstance(v, (list, dict)) else v
+               for k, v in record.items()}
+        self._writer.writerow(row)
+
+
+class JsonlSink(RecordSink):
+    def _load_existing(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                self.written += 1
+                if self.key is not None:
+                    k = json.loads(line).get(self.key)
+                    if k:
+                        self._keys.add(k)
+
+    def _write(self, record: Dict):
+        self._f.write(json.dumps(as_dict(record), ensure_ascii=False) + "\n")
+
+
+class ProductsTxtSink(RecordSink):
+    """The products-with-reviews TXT layout of save_products_with_reviews_txt()."""
+
+    def __init__(self, path: str):
+        super().__init__(path, key="url")
+
+    def _load_existing(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("URL: "):
+                    k = line[5:].rstrip("\n")
+                    if k:
+                        self._keys.add(k)
+                elif line == "====\n":
+                    self.written += 1
+
+    def _write(self, record: Dict):
+        _write_product_txt(self._f, record)
+
+
+def open_sink(output: str, mode: str, fmt: Optional[str] = None) -> RecordSink:
+    """Pick the sink for a run.
+
+    Without an explicit format, quotes go to CSV and shop products to the
+    TXT layout next to `output` (same base name, .txt), as before; an
+    output ending in .jsonl selects JSON Lines. Shop records are
+    de-duplicated by URL.
+    """
+    base, ext = os.path.splitext(output)
+    if fmt is None:
+        if ext.lower() == ".jsonl":
+            fmt = "jsonl"
+        else:
+            fmt = "txt" if mode == "shop" else "csv"
+    key = "url" if mode == "shop" else None
+    if fmt == "jsonl":
+        return JsonlSink(output, key)
+    if fmt == "txt":
+        if mode != "shop":
+            raise ValueError("the TXT format is only available in shop mode")
+        return ProductsTxtSink(output if ext.lower() == ".txt" else f"{base}.txt")
+    # products only carry `reviews` once reviews were attached; the header can't depend on the first one
+    return CsvSink(output, key, list(Product.__slots__) if mode == "shop" else None)
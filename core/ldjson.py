@@ -0,0 +1,69 @@
+import json
+import re
+from typing import Any, List, Optional, Union
+from bs4 import SoupStrainer
+from .document import ParsedPage, as_page
+from .metrics import get_metrics
+
+_LDJSON = "application/ld+json"
+_SCRIPT_RE = re.compile(
+    r"<script\b[^>]*?\stype\s*=\s*([\"']?)application/ld\+json\1(?=[\s/>])[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_SCRIPT_RE_B = re.compile(_SCRIPT_RE.pattern.encode(), re.IGNORECASE | re.DOTALL)
+LDJSON_STRAINER = SoupStrainer("script", attrs={"type": _LDJSON})
+
+
+def scan_ldjson(html: Union[str, bytes]) -> Optional[List[Any]]:
+    """Pull JSON-LD payloads out of raw markup without building a DOM.
+
+    Returns None when the page can't be handled safely this way (a script
+    block the pattern doesn't account for, or a payload that doesn't decode),
+    so the caller can fall back to the BeautifulSoup path.
+    """
+    encoding = getattr(html, "encoding", None)
+    if isinstance(html, bytes):
+        matches = list(_SCRIPT_RE_B.finditer(html))
+        mentions = html.count(_LDJSON.encode())
+    else:
+        matches = list(_SCRIPT_RE.finditer(html))
+        mentions = html.count(_LDJSON)
+    if len(matches) != mentions:
+        return None
+    payloads: List[Any] = []
+    for m in matches:
+        body = m.group(2)
+        try:
+            if encoding is not None:
+                # only the script block is decoded, not the page
+                body = body.decode(encoding)
+            payloads.append(json.loads(body) if body.strip() else {})
+        except (ValueError, RecursionError):
+            # undecodable or nested too deep for json: the soup path skips just that block
+            return None
+    return payloads
+
+
+def _soup_ldjson(html: Union[str, bytes, ParsedPage]) -> List[Any]:
+    soup = as_page(html, parse_only=LDJSON_STRAINER).soup
+    payloads: List[Any] = []
+    for tag in soup.find_all("script", attrs={"type": _LDJSON}):
+        try:
+            payloads.append(json.loads(tag.string or "{}"))
+        except Exception:
+            continue
+    return payloads
+
+
+def extract_ldjson(html: Union[str, bytes, ParsedPage]) -> List[Any]:
+    """Decoded JSON-LD payloads of a page in document order.
+
+    A ParsedPage passed in is only parsed (with its own strainer) if the raw
+    scan has to fall back, so it should be built with LDJSON_STRAINER.
+    """
+    raw = html.html if isinstance(html, ParsedPage) else html
+    with get_metrics().time("parse.json"):
+        payloads = scan_ldjson(raw)
+        if payloads is None:
+            return _soup_ldjson(html)
+    return payloads
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+# upper bounds in seconds, from 100us to one minute
+BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                              0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets; quantiles are interpolated within a bucket."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)   # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                # interpolate inside the bucket
+                return min(lower + (bound - lower) * (rank - seen) / n, self.max)
+            seen += n
+            lower = bound
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_s": round(self.sum, 6),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p90_ms": round(self.quantile(0.9) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Per-stage latency histograms plus counters for one crawl.
+
+    Stages in use: fetch.wait (rate limiter), fetch.ttfb (request sent to
+    headers received, connect included), fetch.download (body), parse.html
+    (building the DOM), parse.json (finding and decoding JSON-LD), extract
+    (DOM / JSON-LD to records), dedupe, write (sinks) and checkpoint.
+    Pages parsed on a ParsePool are timed in the worker and reported here
+    as parse.pool (parse and extract together). Counters: bytes_in,
+    cache_hits, errors, plus response counts per HTTP status. Safe to use
+    from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages: Dict[str, Histogram] = {}
+            self.counters: Counter = Counter()
+            self.status: Counter = Counter()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            h = self.stages.get(stage)
+            if h is None:
+                h = self.stages[stage] = Histogram()
+            h.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def count_status(self, status: int):
+        with self._lock:
+            self.status[str(status)] += 1
+
+    def requests(self) -> int:
+        """Requests answered so far (any status) plus those that failed outright."""
+        with self._lock:
+            return sum(self.status.values()) + self.counters["errors"]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "elapsed_s": round(time.time() - self.started, 3),
+                "stages": {name: h.summary() for name, h in sorted(self.stages.items())},
+                "counters": dict(self.counters),
+                "http_status": dict(self.status),
+            }
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = ["# TYPE scrapper_stage_seconds histogram"]
+        with self._lock:
+            for name, h in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'scrapper_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'scrapper_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'scrapper_stage_seconds_sum{{stage="{name}"}} {h.sum}')
+                lines.append(f'scrapper_stage_seconds_count{{stage="{name}"}} {h.count}')
+            lines.append("# TYPE scrapper_http_responses_total counter")
+            for status, n in sorted(self.status.items()):
+                lines.append(f'scrapper_http_responses_total{{status="{status}"}} {n}')
+            for name, n in sorted(self.counters.items()):
+                lines.append(f"# TYPE scrapper_{name}_total counter")
+                lines.append(f"scrapper_{name}_total {n}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves Metrics.prometheus() at http://host:port/metrics from a background thread."""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="metrics", daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide Metrics every stage reports to."""
+    return _metrics
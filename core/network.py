@@ -1,13 +1,58 @@
+import re
+import time
 import requests
 from requests.adapters import HTTPAdapter, Retry
+from .charset import Markup, as_markup, resolve_encoding
 from .constants import HEADERS
+from .ldjson import scan_ldjson
 from .logging_config import get_logger
-from typing import Optional
+from .metrics import get_metrics
+from .ratelimit import HostRateLimiter, parse_retry_after
+from .shop import walk_ldjson
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .http_cache import ResponseCache
 
 logger = get_logger()
 
+MAX_BODY_SIZE = 10 * 1024 ** 2
+CHUNK_SIZE = 64 * 1024
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+_HEAD_END_RE = re.compile(rb"</head\s*>", re.IGNORECASE)
+_LDJSON_B = b"application/ld+json"
+
+
+class _PoolAdapter(HTTPAdapter):
+    """HTTPAdapter applying a default (connect, read) timeout to requests that don't pass their own."""
+
+    def __init__(self, timeout: Tuple[float, float], **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+def _accept_encoding() -> str:
+    # gzip and deflate always; br and zstd only when brotli / zstandard are installed for urllib3 to decode them
+    try:
+        from urllib3.util.request import ACCEPT_ENCODING
+    except ImportError:
+        return "gzip, deflate"
+    return ", ".join(e.strip() for e in ACCEPT_ENCODING.split(","))
+
 
-def requests_session_with_retries(total_retries: int = 3, backoff: float = 0.3) -> requests.Session:
+def requests_session_with_retries(total_retries: int = 3, backoff: float = 0.3, pool_size: int = 10,
+                                  max_pools: int = 10, connect_timeout: float = 5.0,
+                                  read_timeout: float = 10.0) -> requests.Session:
+    """A Session with retries, keep-alive pools and compressed transfers.
+
+    `pool_size` is how many connections are kept alive per host (size it to
+    the requests in flight, or extra ones are opened and thrown away) and
+    `max_pools` how many hosts keep a pool. Requests made without a timeout
+    get (`connect_timeout`, `read_timeout`).
+    """
     s = requests.Session()
     retries = Retry(
         total=total_retries,
@@ -15,19 +60,173 @@ def requests_session_with_retries(total_retries: int = 3, backoff: float = 0.3)
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET", "POST"],
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = _PoolAdapter((connect_timeout, read_timeout), max_retries=retries,
+                           pool_connections=max_pools, pool_maxsize=pool_size)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     s.headers.update(HEADERS)
+    s.headers["Accept-Encoding"] = _accept_encoding()
     return s
 
 
-def fetch_page(session: requests.Session, url: str, timeout: int = 10) -> Optional[str]:
+def pool_stats(session: requests.Session) -> Dict[str, float]:
+    """Requests sent and connections opened by the session's pools, and the share of requests on a reused connection."""
+    sent = opened = 0
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                sent += pool.num_requests
+                opened += pool.num_connections
+    return {
+        "requests": sent,
+        "connections": opened,
+        "reuse_rate": 1.0 - opened / sent if sent else 0.0,
+    }
+
+
+def _throttled(resp: requests.Response) -> bool:
+    """Whether the server answered 429/503 at any point, including retries urllib3 made for us."""
+    if resp.status_code in (429, 503):
+        return True
+    retries = getattr(resp.raw, "retries", None)
+    return any(h.status in (429, 503) for h in getattr(retries, "history", ()) or ())
+
+
+class BodyRejected(requests.RequestException):
+    """The response body was not read in full: over the size limit, or not HTML."""
+
+
+def _head_has_product(head: bytes) -> bool:
+    """True if a JSON-LD block in `head` (the page up to </head>) describes a Product."""
+    if _LDJSON_B not in head.lower():
+        return False
+    payloads = scan_ldjson(head)
+    return bool(payloads and walk_ldjson(payloads)[0])
+
+
+def _read_body(resp: requests.Response, max_bytes: Optional[int], stop_after_ldjson: bool) -> bool:
+    """Stream the body into resp.content; False if reading stopped after a Product in the <head> JSON-LD.
+
+    Holds at most about `max_bytes` (twice that while the chunks are joined).
+    """
+    ctype = resp.headers.get("Content-Type", "")
+    if 200 <= resp.status_code < 300 and ctype and ctype.split(";", 1)[0].strip().lower() not in HTML_TYPES:
+        resp.close()
+        raise BodyRejected(f"not HTML ({ctype})", response=resp)
+    length = resp.headers.get("Content-Length", "")
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        resp.close()
+        raise BodyRejected(f"body of {length} bytes is over the {max_bytes} byte limit", response=resp)
+    chunks: List[bytes] = []
+    size = 0
+    # looking for </head> only until it shows up
+    head_open = stop_after_ldjson
+    tail = b""
+    complete = True
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            resp.close()
+            raise BodyRejected(f"body over the {max_bytes} byte limit", response=resp)
+        if head_open and _HEAD_END_RE.search(tail + chunk):
+            head_open = False
+            body = b"".join(chunks)
+            end = _HEAD_END_RE.search(body, max(0, size - len(chunk) - len(tail))).end()
+            if _head_has_product(body[:end]):
+                # a Product in <head> is all the JSON-LD extractors need; the rest is not read
+                complete = False
+                resp.close()
+                break
+        tail = chunk[-16:]
+    resp._content = b"".join(chunks)
+    resp._content_consumed = True
+    return complete
+
+
+def _get(session: requests.Session, url: str, timeout: Optional[float], limiter: Optional[HostRateLimiter],
+         headers: Optional[dict] = None, max_bytes: Optional[int] = None,
+         stop_after_ldjson: bool = False) -> Tuple[requests.Response, bool]:
+    metrics = get_metrics()
+    if limiter is not None:
+        with metrics.time("fetch.wait"):
+            limiter.acquire(url)
+    started = time.monotonic()
+    try:
+        resp = session.get(url, timeout=timeout, headers=headers, stream=True)
+        complete = _read_body(resp, max_bytes, stop_after_ldjson)
+    except BodyRejected as e:
+        metrics.count("bodies_rejected")
+        if limiter is not None:
+            limiter.feedback(url, e.response.status_code, time.monotonic() - started)
+        raise
+    except requests.exceptions.RetryError:
+        metrics.count("errors")
+        # urllib3 gave up after repeated 429/5xx answers
+        if limiter is not None:
+            limiter.feedback(url, 429, time.monotonic() - started)
+        raise
+    except requests.RequestException:
+        metrics.count("errors")
+        if limiter is not None:
+            limiter.feedback(url, None, time.monotonic() - started)
+        raise
+    total = time.monotonic() - started
+    # requests sets `elapsed` once the headers are in (connect included); the body is read after
+    ttfb = resp.elapsed.total_seconds()
+    metrics.observe("fetch.ttfb", ttfb)
+    metrics.observe("fetch.download", max(0.0, total - ttfb))
+    metrics.count_status(resp.status_code)
+    metrics.count("bytes_in", len(resp.content))
+    if not complete:
+        metrics.count("bodies_cut_after_ldjson")
+    if limiter is not None:
+        status = 429 if _throttled(resp) else resp.status_code
+        limiter.feedback(url, status, total, parse_retry_after(resp.headers.get("Retry-After")))
+    return resp, complete
+
+
+def fetch_page(session: requests.Session, url: str, timeout: Optional[float] = None,
+               cache: Optional["ResponseCache"] = None,
+               limiter: Optional[HostRateLimiter] = None, max_bytes: Optional[int] = MAX_BODY_SIZE,
+               stop_after_ldjson: bool = False) -> Optional[Markup]:
+    """GET `url` and return its body, or None on failure.
+
+    The body comes back undecoded as PageBytes, tagged with its charset
+    (see core.charset.resolve_encoding), for the parsers to read directly.
+
+    Without a timeout, the session's connect / read timeouts apply.
+
+    The body is streamed: responses that are not HTML, or larger than
+    `max_bytes` (None or 0 = no limit), are dropped as soon as that is
+    known. With `stop_after_ldjson`, reading stops at </head> when the
+    head's JSON-LD describes a Product; JSON-LD further down the page (e.g.
+    review blocks added to the body) is then lost, so it is only meant for
+    product pages. Such partial bodies are not cached.
+
+    With a cache, a stored copy is revalidated with If-None-Match /
+    If-Modified-Since and served from disk on 304. With a limiter, the
+    request waits for the host's rate and reports back how it went.
+    """
     logger.info(f"Fetching {url}")
     try:
-        resp = session.get(url, timeout=timeout)
+        headers = cache.conditional_headers(url) if cache is not None else {}
+        resp, complete = _get(session, url, timeout, limiter, headers or None, max_bytes, stop_after_ldjson)
+        if resp.status_code == 304 and cache is not None:
+            text = cache.load(url)
+            if text is not None:
+                logger.info(f"Not modified, served from cache: {url}")
+                get_metrics().count("cache_hits")
+                return text
+            # index pointed at a body that is gone; fetch it again in full
+            resp, complete = _get(session, url, timeout, limiter, None, max_bytes, stop_after_ldjson)
         resp.raise_for_status()
-        return resp.text
+        encoding = resolve_encoding(resp.content, resp.headers.get("Content-Type"))
+        if complete and cache is not None and "no-store" not in resp.headers.get("Cache-Control", ""):
+            cache.store(url, resp.content, encoding, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return as_markup(resp.content, encoding)
     except requests.RequestException as e:
         logger.error(f"Eroare la get {url}: {e}")
         return None
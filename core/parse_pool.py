@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, List, Optional, Sequence, Tuple
+from .logging_config import get_logger
+from .metrics import get_metrics
+
+logger = get_logger()
+
+
+def _run_chunk(func: Callable, jobs: Sequence[Tuple]) -> Tuple[List, List[float]]:
+    # the worker's own metrics never reach the parent, so send the timings back with the results
+    results, seconds = [], []
+    for args in jobs:
+        t0 = time.perf_counter()
+        results.append(func(*args))
+        seconds.append(time.perf_counter() - t0)
+    return results, seconds
+
+
+def _observe(seconds: List[float]):
+    metrics = get_metrics()
+    for s in seconds:
+        metrics.observe("parse.pool", s)
+
+
+class ParsePool:
+    """Run page parsers on worker processes so parsing can use every core.
+
+    `func` must be a module-level function (it is pickled by reference) and
+    each job is the tuple of arguments for one call, typically the raw page
+    plus its URL. Jobs are shipped in chunks to amortize pickling and results
+    come back in job order.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 8):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        # spawn rather than fork: the crawler already has fetch threads running
+        ctx = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        logger.debug(f"Parse pool started with {self.workers} workers (chunk size {self.chunk_size})")
+
+    def _chunks(self, jobs: Sequence[Tuple]) -> List[Sequence[Tuple]]:
+        # small batches shouldn't all land on one worker
+        size = min(self.chunk_size, max(1, -(-len(jobs) // self.workers)))
+        return [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+    def map(self, func: Callable, jobs: Sequence[Tuple]) -> List:
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        results: List = []
+        for part, seconds in self._executor.map(_run_chunk, repeat(func), self._chunks(jobs)):
+            results.extend(part)
+            _observe(seconds)
+        return results
+
+    def submit(self, func: Callable, jobs: Sequence[Tuple]) -> Future:
+        """Ship one chunk of jobs; the future resolves to the list of results."""
+        outer: Future = Future()
+
+        def _done(inner: Future):
+            if inner.exception() is not None:
+                outer.set_exception(inner.exception())
+                return
+            part, seconds = inner.result()
+            _observe(seconds)
+            outer.set_result(part)
+
+        self._executor.submit(_run_chunk, func, list(jobs)).add_done_callback(_done)
+        return outer
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
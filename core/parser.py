@@ -1,28 +1,37 @@
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+from typing import List, Dict, Optional, Union
 from urllib.parse import urljoin
+from .document import ParsedPage, as_page, class_strainer
+from .metrics import get_metrics
 
+# classes of the elements each extractor reads; combine them to build a
+# ParsedPage shared by several extractors
+ITEMS_CLASSES = ("quote",)
+NEXT_PAGE_CLASSES = ("next",)
+QUOTES_STRAINER = class_strainer(ITEMS_CLASSES + NEXT_PAGE_CLASSES)
 
-def parse_items(html: str, base_url: str) -> List[Dict]:
+
+def parse_items(html: Union[str, ParsedPage], base_url: str) -> List[Dict]:
     """Extract items from quotes.toscrape.com-like pages."""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = as_page(html, base_url, class_strainer(ITEMS_CLASSES)).soup
     items = []
-    quote_blocks = soup.select("div.quote")
-    for qb in quote_blocks:
-        text_el = qb.select_one("span.text")
-        author_el = qb.select_one("small.author")
-        tags = [t.get_text(strip=True) for t in qb.select("div.tags a.tag")]
-        items.append({
-            "text": text_el.get_text(strip=True) if text_el else "",
-            "author": author_el.get_text(strip=True) if author_el else "",
-            "tags": ";".join(tags),
-        })
+    with get_metrics().time("extract"):
+        quote_blocks = soup.select("div.quote")
+        for qb in quote_blocks:
+            text_el = qb.select_one("span.text")
+            author_el = qb.select_one("small.author")
+            tags = [t.get_text(strip=True) for t in qb.select("div.tags a.tag")]
+            items.append({
+                "text": text_el.get_text(strip=True) if text_el else "",
+                "author": author_el.get_text(strip=True) if author_el else "",
+                "tags": ";".join(tags),
+            })
     return items
 
 
-def find_next_page(html: str, base_url: str) -> Optional[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    next_link = soup.select_one("li.next a")
+def find_next_page(html: Union[str, ParsedPage], base_url: str) -> Optional[str]:
+    soup = as_page(html, base_url, class_strainer(NEXT_PAGE_CLASSES)).soup
+    with get_metrics().time("extract"):
+        next_link = soup.select_one("li.next a")
     if next_link and next_link.get("href"):
         return urljoin(base_url, next_link["href"])
     return None
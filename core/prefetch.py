@@ -0,0 +1,51 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from .charset import Markup
+
+
+class Prefetcher:
+    """Fetch upcoming pages on background threads while the current one is processed.
+
+    The crawl loop collects each page with get(url, then=...), which
+    starts prefetching the `then` URLs (up to `depth` in flight) before
+    waiting for `url`, either from a prefetch already running or fetched
+    directly. Requests still go through the crawl's fetch function, so
+    robots.txt and the rate limiter apply to them. Pages prefetched but
+    never collected are simply dropped on close().
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[Markup]], depth: int = 1):
+        self._fetch = fetch
+        self.depth = max(0, depth)
+        self._pool = ThreadPoolExecutor(max_workers=self.depth, thread_name_prefix="prefetch") if self.depth else None
+        self._pending: Dict[str, Future] = {}
+        self._ready: Dict[str, Optional[Markup]] = {}
+
+    def adopt(self, pages: Dict[str, Optional[Markup]]):
+        """Pages fetched elsewhere (e.g. by a CatalogProbe) that get() should hand out instead of refetching."""
+        self._ready.update(pages)
+
+    def want(self, urls: Iterable[str]):
+        if self._pool is None:
+            return
+        for u in urls:
+            if u not in self._pending and u not in self._ready and len(self._pending) < self.depth:
+                self._pending[u] = self._pool.submit(self._fetch, u)
+
+    def get(self, url: str, then: Iterable[str] = ()) -> Optional[Markup]:
+        if url in self._ready:
+            self.want(then)
+            return self._ready.pop(url)
+        fut = self._pending.pop(url, None)
+        self.want(then)
+        if fut is None:
+            return self._fetch(url)
+        return fut.result()
+
+    def close(self):
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+        self._ready.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from .metrics import get_metrics
+
+
+class CrawlCancelled(Exception):
+    """Raised inside a crawl once its cancel event is set."""
+
+
+def check_cancelled(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise CrawlCancelled()
+
+
+def cancellable_sleep(cancel: Optional[threading.Event]) -> Callable[[float], None]:
+    """A time.sleep replacement that wakes up (raising CrawlCancelled) as soon as `cancel` is set."""
+    if cancel is None:
+        return time.sleep
+
+    def _sleep(seconds: float):
+        if cancel.wait(seconds):
+            raise CrawlCancelled()
+
+    return _sleep
+
+
+class ProgressReporter:
+    """Feeds a progress callback from the crawl loop.
+
+    The callback gets a dict with pages_done, max_pages, items (records
+    written), reviews (product pages handled), requests, requests_per_s,
+    elapsed_s and eta_s (None until a page is done; estimated against
+    max_pages, so a catalog that ends early finishes sooner). It runs on the
+    crawler's thread; page updates are always sent, review updates at most
+    every `interval` seconds.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Dict], None]], max_pages: int,
+                 written: Callable[[], int], pages_done: int = 0, interval: float = 0.25):
+        self.callback = callback
+        self.max_pages = max_pages
+        self.pages_done = pages_done
+        self.reviews = 0
+        self.interval = interval
+        self._written = written
+        self._first_page = pages_done
+        self._started = time.monotonic()
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def page_done(self):
+        with self._lock:
+            self.pages_done += 1
+        self._emit(force=True)
+
+    def reviews_done(self, n: int = 1):
+        with self._lock:
+            self.reviews += n
+        self._emit()
+
+    def finish(self):
+        self._emit(force=True)
+
+    def _emit(self, force: bool = False):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last < self.interval:
+                return
+            self._last = now
+            pages = self.pages_done
+            reviews = self.reviews
+        elapsed = now - self._started
+        done_here = pages - self._first_page
+        eta = (self.max_pages - pages) * elapsed / done_here if done_here > 0 else None
+        requests = get_metrics().requests()
+        self.callback({
+            "pages_done": pages,
+            "max_pages": self.max_pages,
+            "items": self._written(),
+            "reviews": reviews,
+            "requests": requests,
+            "requests_per_s": requests / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "eta_s": max(0.0, eta) if eta is not None else None,
+        })
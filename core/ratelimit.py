@@ -0,0 +1,110 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from .logging_config import get_logger
+
+logger = get_logger()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostBucket:
+    def __init__(self, rate: float, floor_interval: float):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.floor_interval = floor_interval
+        self.tokens = 1.0
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency: Optional[float] = None       # EWMA of response time
+        self.best_latency: Optional[float] = None  # lowest EWMA seen, the host's "unloaded" latency
+
+
+class HostRateLimiter:
+    """Per-host token bucket whose rate follows how the host is coping.
+
+    Every fetch calls acquire() before the request and feedback() after it.
+    The rate grows additively while responses are fast and is halved on
+    429/503 (or errors), or cut when latency climbs well above the best
+    seen for that host; Retry-After blocks the host for the given time.
+    The rate never goes above `max_rate` nor above what robots.txt asks
+    for (`min_interval(url)`, e.g. RobotsCache.min_interval).
+    """
+
+    def __init__(self, initial_rate: float = 1.0, min_rate: float = 0.1, max_rate: float = 5.0,
+                 min_interval: Optional[Callable[[str], float]] = None, sleep: Callable[[float], None] = time.sleep):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.initial_rate = min(max(initial_rate, self.min_rate), self.max_rate)
+        self.step = max(self.min_rate, self.initial_rate * 0.1)
+        self._min_interval = min_interval
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostBucket] = {}
+
+    def _bucket(self, url: str) -> _HostBucket:
+        host = urlparse(url).netloc.lower()
+        b = self._hosts.get(host)
+        if b is None:
+            floor = self._min_interval(url) if self._min_interval is not None else 0.0
+            with self._lock:
+                b = self._hosts.get(host)
+                if b is None:
+                    rate = self.initial_rate
+                    if floor > 0:
+                        rate = min(rate, 1.0 / floor)
+                    b = _HostBucket(rate, floor)
+                    self._hosts[host] = b
+        return b
+
+    def _ceiling(self, b: _HostBucket) -> float:
+        return min(self.max_rate, 1.0 / b.floor_interval) if b.floor_interval > 0 else self.max_rate
+
+    def acquire(self, url: str):
+        """Block until a request to the host of `url` may be sent."""
+        b = self._bucket(url)
+        with b.lock:
+            now = time.monotonic()
+            b.tokens = min(1.0, b.tokens + (now - b.last) * b.rate)
+            b.last = now
+            # take the token now even if it isn't there yet; the deficit is our place in line
+            b.tokens -= 1.0
+            wait = max(b.blocked_until - now, -b.tokens / b.rate if b.tokens < 0 else 0.0)
+        if wait > 0:
+            self._sleep(wait)
+
+    def feedback(self, url: str, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """Adjust the host's rate after a response (status None = request failed)."""
+        b = self._bucket(url)
+        with b.lock:
+            old = b.rate
+            if status in (429, 503) or status is None:
+                b.rate = max(self.min_rate, b.rate / 2)
+                if retry_after:
+                    b.blocked_until = max(b.blocked_until, time.monotonic() + retry_after)
+            else:
+                b.latency = latency if b.latency is None else 0.8 * b.latency + 0.2 * latency
+                if b.best_latency is None or b.latency < b.best_latency:
+                    b.best_latency = b.latency
+                if b.latency > 2 * b.best_latency + 0.05:
+                    b.rate = max(self.min_rate, b.rate * 0.8)
+                else:
+                    b.rate = min(self._ceiling(b), b.rate + self.step)
+            if b.rate < old:
+                logger.debug(f"Rate for {urlparse(url).netloc}: {old:.2f} -> {b.rate:.2f} req/s (status={status})")
+
+    def rates(self) -> Dict[str, float]:
+        return {host: b.rate for host, b in self._hosts.items()}
@@ -0,0 +1,127 @@
+import sys
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+
+class _Record:
+    """Fixed-field record with a dict-like face.
+
+    Records keep their fields in __slots__ (no per-instance __dict__), which
+    is what makes them small; get(), [] and items() let code written for
+    the old dicts (writers, checkpoint) read them unchanged. A field set to
+    None still counts as present, like a dict key holding None.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _fieldset: FrozenSet[str] = frozenset()
+
+    def _has(self, key: object) -> bool:
+        return key in self._fieldset
+
+    def keys(self) -> List[str]:
+        return list(self._fields)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __contains__(self, key: object) -> bool:
+        return self._has(key)
+
+    def __getitem__(self, key: str) -> Any:
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            # fixed fields only; a typo must not pass silently
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if self._has(key) else default
+
+    def values(self) -> List[Any]:
+        return [getattr(self, k) for k in self.keys()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: as_dict(v) for k, v in self.items()}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (_Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class Review(_Record):
+    __slots__ = ("product", "author", "rating", "body")
+    _fields = __slots__
+    _fieldset = frozenset(_fields)
+
+    def __init__(self, product: Optional[str] = None, author: Optional[str] = None,
+                 rating: Optional[float] = None, body: Optional[str] = None):
+        self.product = product
+        self.author = author
+        self.rating = rating
+        self.body = body
+
+
+class Product(_Record):
+    """A shop product; `reviews` only shows up as a key once reviews were attached."""
+
+    __slots__ = ("title", "description", "sku", "brand", "price", "currency", "availability", "url",
+                 "rating", "review_count", "reviews")
+    _fields = __slots__[:-1]
+    _fieldset = frozenset(__slots__)
+
+    def __init__(self, title: Optional[str] = None, description: Optional[str] = None, sku: Optional[str] = None,
+                 brand: Optional[str] = None, price: Any = None, currency: Optional[str] = None,
+                 availability: Optional[str] = None, url: Optional[str] = None, rating: Optional[float] = None,
+                 review_count: Optional[int] = None, reviews: Optional[List[Review]] = None):
+        self.title = title
+        self.description = description
+        self.sku = sku
+        self.brand = brand
+        self.price = price
+        # the same few values repeat on every product, keep one copy of each
+        self.currency = sys.intern(currency) if isinstance(currency, str) else currency
+        self.availability = sys.intern(availability) if isinstance(availability, str) else availability
+        self.url = url
+        self.rating = rating
+        self.review_count = review_count
+        self.reviews = reviews
+
+    def _has(self, key: object) -> bool:
+        return key in self._fieldset and (key != "reviews" or self.reviews is not None)
+
+    def keys(self) -> List[str]:
+        return list(self.__slots__) if self.reviews is not None else list(self._fields)
+
+
+def as_dict(value: Any) -> Any:
+    """Plain dicts/lists for records (recursively), e.g. before json.dumps; other values as they are."""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [as_dict(v) for v in value]
+    return value
+
+
+def product_from_dict(d: Dict) -> Product:
+    p = Product(**{k: d.get(k) for k in Product._fields})
+    if d.get("reviews") is not None:
+        p.reviews = [review_from_dict(r) for r in d["reviews"]]
+    return p
+
+
+def review_from_dict(d: Dict) -> Review:
+    return Review(d.get("product"), d.get("author"), d.get("rating"), d.get("body"))
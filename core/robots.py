@@ -1,22 +1,106 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 import urllib.robotparser as robotparser
+import requests
 from .constants import HEADERS
 from .logging_config import get_logger
 
 logger = get_logger()
 
 
+class RobotsCache:
+    """robots.txt rules per scheme+host, fetched once and kept for `ttl` seconds.
+
+    robots.txt is downloaded through the given requests session (so it uses
+    the crawler's headers and connection pool). Lookups after the first one
+    for a host are in-memory only; concurrent first lookups for the same host
+    wait for a single fetch.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, ttl: float = 3600.0,
+                 user_agent: str = HEADERS["User-Agent"], timeout: int = 10):
+        self.session = session
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.fetches = 0
+        self._entries: Dict[str, Tuple[robotparser.RobotFileParser, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        if self.session is None:
+            from .network import requests_session_with_retries
+            self.session = requests_session_with_retries()
+        return self.session
+
+    def _fetch(self, origin: str) -> robotparser.RobotFileParser:
+        robots_url = f"{origin}/robots.txt"
+        rp = robotparser.RobotFileParser(robots_url)
+        self.fetches += 1
+        try:
+            resp = self._session().get(robots_url, timeout=self.timeout)
+        except requests.exceptions.RetryError as e:
+            # the server kept failing; like urllib's reader, treat as "don't crawl"
+            logger.warning(f"robots.txt indisponibil ({robots_url}): {e}. Nu accesăm acest host.")
+            rp.disallow_all = True
+            return rp
+        except requests.RequestException as e:
+            logger.warning(f"Nu s-a putut citi robots.txt ({robots_url}): {e}. Continuăm cu precauție.")
+            rp.allow_all = True
+            return rp
+        if resp.status_code in (401, 403) or resp.status_code >= 500:
+            rp.disallow_all = True
+        elif resp.status_code >= 400:
+            rp.allow_all = True
+        else:
+            rp.parse(resp.text.splitlines())
+            rp.modified()
+        logger.debug(f"robots.txt verificat la {robots_url}: status={resp.status_code}")
+        return rp
+
+    def parser_for(self, url: str) -> robotparser.RobotFileParser:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}".lower()
+        entry = self._entries.get(origin)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        with self._lock:
+            host_lock = self._locks.setdefault(origin, threading.Lock())
+        with host_lock:
+            entry = self._entries.get(origin)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                entry = (self._fetch(origin), time.monotonic())
+                self._entries[origin] = entry
+        return entry[0]
+
+    def can_fetch(self, url: str) -> bool:
+        return self.parser_for(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        delay = self.parser_for(url).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    def request_rate(self, url: str) -> Optional[robotparser.RequestRate]:
+        return self.parser_for(url).request_rate(self.user_agent)
+
+    def min_interval(self, url: str) -> float:
+        """Seconds to leave between requests to the host of `url` (0 if robots.txt sets no limit)."""
+        interval = self.crawl_delay(url) or 0.0
+        rate = self.request_rate(url)
+        if rate is not None and rate.requests:
+            interval = max(interval, rate.seconds / rate.requests)
+        return interval
+
+
+_default_cache: Optional[RobotsCache] = None
+
+
 def can_fetch(url: str, user_agent: str = HEADERS["User-Agent"]) -> bool:
     """Check robots.txt permissions for a URL."""
-    parsed = urlparse(url)
-    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-    rp = robotparser.RobotFileParser()
-    try:
-        rp.set_url(robots_url)
-        rp.read()
-        allowed = rp.can_fetch(user_agent, url)
-        logger.debug(f"robots.txt verificat la {robots_url}: allowed={allowed}")
-        return allowed
-    except Exception as e:
-        logger.warning(f"Nu s-a putut citi robots.txt ({robots_url}): {e}. Continuăm cu precauție.")
-        return True
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RobotsCache()
+    return _default_cache.parser_for(url).can_fetch(user_agent, url)
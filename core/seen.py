@@ -0,0 +1,172 @@
+import hashlib
+import math
+import threading
+from typing import Iterable, List, Optional, Set
+from .logging_config import get_logger
+
+logger = get_logger()
+
+COMMIT_EVERY = 100
+
+
+def fingerprint(url: str) -> int:
+    """Fixed-size (64-bit, signed so SQLite can store it) digest of a URL."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class BloomFilter:
+    """Bit array answering "definitely not seen" without touching the exact store."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, fp: int):
+        # double hashing on the two halves of the 64-bit fingerprint
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) & 0xFFFFFFFF | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, fp: int):
+        for pos in self._positions(fp):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fp: int) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fp))
+
+
+class MemorySeenStore:
+    """Seen-URL set holding 64-bit fingerprints instead of URL strings.
+
+    Behaves like a set of URLs (add, in, len) plus batch methods. A
+    fingerprint collision would make two URLs count as one; at 64 bits that
+    is negligible for catalogs of millions of products.
+    """
+
+    def __init__(self, bloom: Optional[BloomFilter] = None):
+        self.bloom = bloom
+        self._fps: Set[int] = set()
+
+    def _has(self, fp: int) -> bool:
+        if self.bloom is not None and fp not in self.bloom:
+            return False
+        return fp in self._fps
+
+    def _put(self, fp: int):
+        self._fps.add(fp)
+
+    def __contains__(self, url: str) -> bool:
+        return self._has(fingerprint(url))
+
+    def add(self, url: str):
+        fp = fingerprint(url)
+        if self.bloom is not None:
+            self.bloom.add(fp)
+        self._put(fp)
+
+    def add_many(self, urls: Iterable[str]):
+        for url in urls:
+            self.add(url)
+
+    def contains_many(self, urls: List[str]) -> List[bool]:
+        return [self._has(fingerprint(u)) for u in urls]
+
+    def __len__(self) -> int:
+        return len(self._fps)
+
+    def close(self):
+        pass
+
+
+class SqliteSeenStore(MemorySeenStore):
+    """Seen-URL fingerprints persisted in SQLite, so dedupe carries over between runs.
+
+    Each `namespace` (e.g. "items", "reviews") is its own table in the same
+    database file. With a Bloom filter in front, URLs never seen before are
+    answered without a query. New fingerprints are held in memory and
+    written COMMIT_EVERY at a time (and on close), each batch in one short
+    transaction so the other namespaces are not kept waiting on the file.
+    """
+
+    def __init__(self, path: str, namespace: str, bloom: Optional[BloomFilter] = None):
+        import sqlite3  # only runs that keep seen URLs on disk need it
+
+        super().__init__(bloom)
+        self.path = path
+        self.table = f"seen_{namespace}"
+        self._lock = threading.Lock()
+        self._pending: Set[int] = set()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (fp INTEGER PRIMARY KEY)")
+        self._db.commit()
+        if bloom is not None:
+            for (fp,) in self._db.execute(f"SELECT fp FROM {self.table}"):
+                bloom.add(fp)
+        logger.debug(f"Seen store {path}:{namespace} opened with {len(self)} URLs")
+
+    def _has(self, fp: int) -> bool:
+        if self.bloom is not None and fp not in self.bloom:
+            return False
+        with self._lock:
+            if fp in self._pending:
+                return True
+            return self._db.execute(f"SELECT 1 FROM {self.table} WHERE fp = ?", (fp,)).fetchone() is not None
+
+    def _flush(self):
+        # caller holds the lock; the file's write lock is only taken for the batch itself
+        if self._pending:
+            self._db.executemany(f"INSERT OR IGNORE INTO {self.table} (fp) VALUES (?)",
+                                 [(fp,) for fp in self._pending])
+            self._db.commit()
+            self._pending.clear()
+
+    def _put(self, fp: int):
+        with self._lock:
+            self._pending.add(fp)
+            if len(self._pending) >= COMMIT_EVERY:
+                self._flush()
+
+    def add_many(self, urls: Iterable[str]):
+        fps = [fingerprint(u) for u in urls]
+        if self.bloom is not None:
+            for fp in fps:
+                self.bloom.add(fp)
+        with self._lock:
+            self._pending.update(fps)
+            if len(self._pending) >= COMMIT_EVERY:
+                self._flush()
+
+    def contains_many(self, urls: List[str]) -> List[bool]:
+        fps = [fingerprint(u) for u in urls]
+        candidates = [fp for fp in fps if self.bloom is None or fp in self.bloom]
+        with self._lock:
+            found = {fp for fp in candidates if fp in self._pending}
+            for i in range(0, len(candidates), 500):
+                chunk = candidates[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(fp for (fp,) in self._db.execute(
+                    f"SELECT fp FROM {self.table} WHERE fp IN ({marks})", chunk))
+        return [fp in found for fp in fps]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush()
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+
+def open_seen_store(kind: str = "memory", namespace: str = "items", path: Optional[str] = None,
+                    bloom_capacity: int = 0) -> MemorySeenStore:
+    """A seen-URL store: "memory" (fingerprints for this run) or "sqlite" (kept between runs)."""
+    bloom = BloomFilter(bloom_capacity) if bloom_capacity > 0 else None
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("the sqlite seen store needs a database path")
+        return SqliteSeenStore(path, namespace, bloom)
+    return MemorySeenStore(bloom)
@@ -1,93 +1,68 @@
-import json
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple, Union
 from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
-from bs4 import BeautifulSoup
+from .document import ParsedPage
+from .ldjson import extract_ldjson
+from .metrics import get_metrics
+from .records import Product, Review
 
 
-def _extract_products_from_ldjson(soup: BeautifulSoup) -> List[Dict]:
-    products: List[Dict] = []
-    for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        try:
-            data = json.loads(tag.string or "{}")
-        except Exception:
-            continue
-        stack = [data]
-        while stack:
-            node = stack.pop()
-            if isinstance(node, list):
-                stack.extend(node)
-                continue
-            if not isinstance(node, dict):
-                continue
-            t = node.get("@type") or node.get("type")
-            if isinstance(t, list):
-                t = t[0] if t else None
-            if t == "Product":
-                offer = node.get("offers") or {}
-                if isinstance(offer, list):
-                    offer = offer[0] if offer else {}
-                brand = node.get("brand")
-                if isinstance(brand, dict):
-                    brand = brand.get("name")
-                agg = node.get("aggregateRating") or {}
-                if isinstance(agg, list):
-                    agg = agg[0] if agg else {}
-                rating = None
-                review_count = None
-                try:
-                    rating = float(agg.get("ratingValue")) if agg.get("ratingValue") is not None else None
-                except Exception:
-                    pass
-                try:
-                    review_count = int(agg.get("reviewCount")) if agg.get("reviewCount") is not None else None
-                except Exception:
-                    pass
-                products.append({
-                    "title": node.get("name"),
-                    "description": node.get("description"),
-                    "sku": node.get("sku"),
-                    "brand": brand,
-                    "price": offer.get("price"),
-                    "currency": offer.get("priceCurrency"),
-                    "availability": offer.get("availability"),
-                    "url": node.get("url"),
-                    "rating": rating,
-                    "review_count": review_count,
-                })
-            # walk nested nodes
-            for k, v in node.items():
-                if isinstance(v, (list, dict)):
-                    stack.append(v)
-    return [p for p in products if any(v is not None for v in p.values())]
+def _first(value: Any) -> Any:
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
 
 
-def parse_products(html: str, base_url: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    items = _extract_products_from_ldjson(soup)
-    return items
+def _to_number(value: Any, cast) -> Optional[Union[int, float]]:
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except Exception:
+        return None
 
 
-def next_page_url(url: str, current_page: int) -> str:
-    parsed = urlparse(url)
-    q = parse_qs(parsed.query)
-    page = current_page + 1
-    q["page"] = [str(page)]
-    new_query = urlencode({k: v[0] if isinstance(v, list) and v else v for k, v in q.items()})
-    return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
+def _product_record(node: Dict) -> Product:
+    offer = _first(node.get("offers") or {})
+    if not isinstance(offer, dict):
+        offer = {}
+    brand = node.get("brand")
+    if isinstance(brand, dict):
+        brand = brand.get("name")
+    agg = _first(node.get("aggregateRating") or {})
+    if not isinstance(agg, dict):
+        agg = {}
+    return Product(
+        title=node.get("name"),
+        description=node.get("description"),
+        sku=node.get("sku"),
+        brand=brand,
+        price=offer.get("price"),
+        currency=offer.get("priceCurrency"),
+        availability=offer.get("availability"),
+        url=node.get("url"),
+        rating=_to_number(agg.get("ratingValue"), float),
+        review_count=_to_number(agg.get("reviewCount"), int),
+    )
 
 
-def parse_reviews(html: str) -> List[Dict]:
-    """Extract review entries from Product JSON-LD on a product page.
-    Returns list of dicts: {product, author, rating, body}
+def _non_empty(products: List[Product]) -> List[Product]:
+    return [p for p in products if any(v is not None for v in p.values())]
+
+
+def walk_ldjson(payloads: List, max_reviews: Optional[int] = None) -> Tuple[List[Product], List[Review]]:
+    """Visit the JSON-LD graph once, collecting products and their reviews.
+
+    Returns (products, reviews) as Product / Review records. Products carry
+    offer and aggregate rating fields; a review's product is the name of the
+    first Product met. With a positive `max_reviews` the walk
+    stops as soon as that many reviews are collected, so the product list is
+    only complete when no limit is given.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    reviews: List[Dict] = []
+    limit = max_reviews if isinstance(max_reviews, int) and max_reviews > 0 else None
+    products: List[Product] = []
+    reviews: List[Review] = []
     product_name: Optional[str] = None
-    for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        try:
-            data = json.loads(tag.string or "{}")
-        except Exception:
-            continue
+    for data in payloads:
         stack = [data]
         while stack:
             node = stack.pop()
@@ -96,10 +71,9 @@ def parse_reviews(html: str) -> List[Dict]:
                 continue
             if not isinstance(node, dict):
                 continue
-            t = node.get("@type") or node.get("type")
-            if isinstance(t, list):
-                t = t[0] if t else None
+            t = _first(node.get("@type") or node.get("type"))
             if t == "Product":
+                products.append(_product_record(node))
                 if not product_name:
                     product_name = node.get("name")
                 rv = node.get("review")
@@ -110,22 +84,47 @@ def parse_reviews(html: str) -> List[Dict]:
                         author = r.get("author")
                         if isinstance(author, dict):
                             author = author.get("name")
-                        rating = None
                         rr = r.get("reviewRating")
-                        if isinstance(rr, dict):
-                            try:
-                                rating = float(rr.get("ratingValue")) if rr.get("ratingValue") is not None else None
-                            except Exception:
-                                pass
-                        body = r.get("reviewBody") or r.get("description")
-                        reviews.append({
-                            "product": product_name,
-                            "author": author,
-                            "rating": rating,
-                            "body": body,
-                        })
+                        rating = _to_number(rr.get("ratingValue"), float) if isinstance(rr, dict) else None
+                        reviews.append(Review(
+                            product=product_name,
+                            author=author,
+                            rating=rating,
+                            body=r.get("reviewBody") or r.get("description"),
+                        ))
+                        if limit is not None and len(reviews) >= limit:
+                            return _non_empty(products), reviews
             # walk nested nodes
             for k, v in node.items():
                 if isinstance(v, (list, dict)):
                     stack.append(v)
+    return _non_empty(products), reviews
+
+
+def parse_product_page(html: Union[str, ParsedPage], max_reviews: Optional[int] = None) -> Tuple[List[Product], List[Review]]:
+    """Products and reviews of a page from a single pass over its JSON-LD."""
+    payloads = extract_ldjson(html)
+    with get_metrics().time("extract"):
+        return walk_ldjson(payloads, max_reviews)
+
+
+def parse_products(html: Union[str, ParsedPage], base_url: str) -> List[Product]:
+    items, _ = parse_product_page(html)
+    return items
+
+
+def next_page_url(url: str, current_page: int) -> str:
+    parsed = urlparse(url)
+    q = parse_qs(parsed.query)
+    page = current_page + 1
+    q["page"] = [str(page)]
+    new_query = urlencode({k: v[0] if isinstance(v, list) and v else v for k, v in q.items()})
+    return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
+
+
+def parse_reviews(html: Union[str, ParsedPage], max_reviews: Optional[int] = None) -> List[Review]:
+    """Extract review entries from Product JSON-LD on a product page.
+    Returns list of Review records: {product, author, rating, body}
+    """
+    _, reviews = parse_product_page(html, max_reviews)
     return reviews
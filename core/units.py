@@ -0,0 +1,11 @@
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes like '500M', '2G' or '1048576' into bytes."""
+    v = value.strip().upper()
+    if v.endswith("B"):
+        v = v[:-1]
+    unit = v[-1] if v and v[-1] in _UNITS else ""
+    number = v[:-1] if unit else v
+    return int(float(number) * _UNITS[unit])
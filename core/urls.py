@@ -0,0 +1,103 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
+
+# query parameters that only track where a visit came from; a trailing * matches a prefix
+TRACKING_PARAMS: Tuple[str, ...] = (
+    "utm_*", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref_src", "spm",
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_PCT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+# everything RFC 3986 allows unescaped in a path or query, plus existing escapes
+_SAFE = "!$&'()*+,;=:@/?-._~%"
+
+
+def _normalize_escapes(part: str) -> str:
+    # %7e -> ~ and %2f -> %2F; unreserved characters never need escaping, the rest keep it in upper case
+    def _fix(m: "re.Match") -> str:
+        ch = chr(int(m.group(1), 16))
+        return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+
+    return quote(_PCT_RE.sub(_fix, part), safe=_SAFE)
+
+
+class UrlNormalizer:
+    """Canonical form of product URLs, used both to dedupe and to fetch.
+
+    Scheme and host are lower-cased and default ports dropped, escapes are
+    normalized, a trailing slash and the fragment are removed, and query
+    parameters are sorted by name with those on `denylist` stripped (names
+    are compared case-insensitively, a trailing * matches a prefix). Results
+    are memoized in an LRU of `cache_size` entries, since the same product
+    shows up on several listing pages; `url in normalizer` tells whether
+    that exact string was normalized recently.
+    """
+
+    def __init__(self, denylist: Iterable[str] = TRACKING_PARAMS, cache_size: int = 65536):
+        names = [d.lower() for d in denylist]
+        self._exact = frozenset(n for n in names if not n.endswith("*"))
+        self._prefixes = tuple(n[:-1] for n in names if n.endswith("*"))
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._memo
+
+    def normalize(self, url: str) -> str:
+        with self._lock:
+            canon = self._memo.get(url)
+            if canon is not None:
+                self._memo.move_to_end(url)
+                self.hits += 1
+                return canon
+        canon = self._normalize(url)
+        with self._lock:
+            self.misses += 1
+            self._memo[url] = canon
+            if len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+        return canon
+
+    def _dropped(self, name: str) -> bool:
+        name = name.lower()
+        return name in self._exact or name.startswith(self._prefixes)
+
+    def _normalize(self, url: str) -> str:
+        try:
+            p = urlsplit(url)
+            scheme = (p.scheme or "http").lower()
+            host = p.hostname or ""
+            port = p.port
+        except ValueError:
+            return url
+        if ":" in host:
+            host = f"[{host}]"   # IPv6 literal
+        netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+        if p.username is not None:
+            netloc = p.netloc.rsplit("@", 1)[0] + "@" + netloc
+        path = _normalize_escapes(p.path) or "/"
+        if len(path) > 1 and path.endswith("/"):
+            path = path.rstrip("/")
+        params = []
+        for pair in p.query.split("&"):
+            if not pair:
+                continue
+            name = pair.split("=", 1)[0]
+            if not self._dropped(name):
+                params.append((_normalize_escapes(name), _normalize_escapes(pair)))
+        # by name only: repeated names keep their order, which may matter to the site
+        params.sort(key=lambda kv: kv[0])
+        return urlunsplit((scheme, netloc, path, "&".join(pair for _, pair in params), ""))
+
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
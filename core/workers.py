@@ -0,0 +1,31 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class HostSlots:
+    """Per-host ceiling on concurrent requests made from worker threads."""
+
+    def __init__(self, per_host: int = 4):
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            sem = self._hosts.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host)
+                self._hosts[host] = sem
+            return sem
+
+    @contextmanager
+    def slot(self, url: str):
+        sem = self._semaphore(url)
+        sem.acquire()
+        try:
+            yield
+        finally:
+            sem.release()
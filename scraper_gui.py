@@ -2,9 +2,52 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import threading
 import queue
-import os
-from scraper import scrape, logger
-from typing import Optional
+import logging
+from collections import deque
+from scraper import scrape
+from typing import List, Optional
+
+LOG_MAX_LINES = 5000      # lines kept in the log pane; older ones are trimmed
+LOG_BUFFER_SIZE = 10000   # lines waiting for the UI; beyond that the oldest are dropped
+LOG_BATCH = 500           # lines inserted per UI tick
+
+
+class BufferedLogHandler(logging.Handler):
+    """Logging handler that never blocks the scraper thread.
+
+    Records go into a bounded ring buffer that the UI drains in batches;
+    when the UI falls behind, the oldest lines are dropped and counted
+    instead of slowing the crawl down.
+    """
+
+    def __init__(self, maxlen: int = LOG_BUFFER_SIZE):
+        super().__init__()
+        self.lines: deque = deque(maxlen=maxlen)
+        self.dropped = 0
+        self._buf_lock = threading.Lock()
+
+    def push(self, line: str):
+        with self._buf_lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line)
+
+    def emit(self, record):
+        try:
+            self.push(record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+    def drain(self, limit: int) -> List[str]:
+        with self._buf_lock:
+            n = min(limit, len(self.lines))
+            return [self.lines.popleft() for _ in range(n)]
+
+    def clear(self):
+        with self._buf_lock:
+            self.lines.clear()
+            self.dropped = 0
+
 
 class ScraperApp:
     def __init__(self, root):
@@ -36,8 +79,9 @@ class ScraperApp:
         style.configure('Success.TButton', background=self.colors['success'], foreground='white')
         style.configure('Error.TButton', background=self.colors['error'], foreground='white')
         
-        # Queue for thread-safe communication
+        # Queue for thread-safe communication (status/progress/done); log lines go through log_handler
         self.queue = queue.Queue()
+        self.log_handler = BufferedLogHandler()
         
         # Create main container
         self.container = ttk.Frame(root, padding="20")
@@ -166,6 +210,8 @@ class ScraperApp:
     
     def clear_log(self):
         self.log_area.delete(1.0, tk.END)
+        self.log_handler.clear()
+        self.log_frame.config(text="Scraping Log")
         self.status_var.set("Log cleared")
     
     def start_scraping(self):
@@ -198,6 +244,8 @@ class ScraperApp:
         
         # Clear previous logs
         self.log_area.delete(1.0, tk.END)
+        self.log_handler.clear()
+        self.log_frame.config(text="Scraping Log")
         self.status_var.set("Starting...")
         self.progress_var.set(0)
         
@@ -215,42 +263,44 @@ class ScraperApp:
     
     def run_scraper(self, url: str, output: str, delay: float, max_pages: int, mode: str, max_reviews: Optional[int]):
         try:
-            # Redirect logger to our queue
-            import logging
-            from functools import partial
-            
-            class QueueHandler(logging.Handler):
-                def __init__(self, queue):
-                    super().__init__()
-                    self.queue = queue
-                
-                def emit(self, record):
-                    self.queue.put(record.msg)
-            
-            # Configure logger
+            # Redirect logger to the log buffer
             logger = logging.getLogger("scrapper")
-            logger.handlers = [QueueHandler(self.queue)]
+            logger.handlers = [self.log_handler]
             
             # Run the scraper
-            self.queue.put(f"Starting scraping: {url} (mode={mode})")
+            self.log_handler.push(f"Starting scraping: {url} (mode={mode})")
             scrape(
                 start_url=url,
                 output=output,
                 delay=delay,
                 max_pages=max_pages,
                 mode=mode,
-                max_reviews_per_product=max_reviews
+                max_reviews_per_product=max_reviews,
+                progress=self.report_progress,
+                cancel=self.stop_event
             )
-            self.queue.put("Scraping completed successfully!")
-            self.queue.put(("status", "Scraping completed!"))
-            self.queue.put(("progress", 100))
+            if self.stop_event.is_set():
+                self.log_handler.push("Scraping stopped; partial results were saved.")
+                self.queue.put(("status", "Stopped - partial results saved"))
+            else:
+                self.log_handler.push("Scraping completed successfully!")
+                self.queue.put(("status", "Scraping completed!"))
+                self.queue.put(("progress", 100))
             
         except Exception as e:
-            self.queue.put(f"Error during scraping: {str(e)}")
+            self.log_handler.push(f"Error during scraping: {str(e)}")
             self.queue.put(("status", f"Error: {str(e)}"))
         finally:
             self.queue.put(("done", None))
     
+    def report_progress(self, p: dict):
+        # called on the scraper thread; the UI picks it up from the queue
+        pct = min(100.0, 100.0 * p["pages_done"] / p["max_pages"]) if p["max_pages"] else 0.0
+        eta = f", ETA {p['eta_s']:.0f}s" if p["eta_s"] is not None else ""
+        self.queue.put(("progress", pct))
+        self.queue.put(("status", f"Page {p['pages_done']}/{p['max_pages']}: {p['items']} items, "
+                                  f"{p['reviews']} product pages, {p['requests_per_s']:.1f} req/s{eta}"))
+    
     def stop_scraping(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to stop the current operation?"):
             self.stop_event.set()
@@ -279,14 +329,27 @@ class ScraperApp:
                         elif msg[0] == "done":
                             self.toggle_controls(True)
                     else:
-                        self.log_area.insert(tk.END, msg + "\n")
-                        self.log_area.see(tk.END)
+                        self.log_handler.push(msg)
                 except queue.Empty:
                     break
+            self.flush_log()
         except Exception as e:
             self.log_area.insert(tk.END, f"Error processing queue: {str(e)}\n")
         
         self.root.after(100, self.process_queue)
+    
+    def flush_log(self):
+        """Insert the waiting log lines with one widget update and trim the pane."""
+        lines = self.log_handler.drain(LOG_BATCH)
+        if not lines:
+            return
+        self.log_area.insert(tk.END, "\n".join(lines) + "\n")
+        total = int(self.log_area.index("end-1c").split(".")[0])
+        if total > LOG_MAX_LINES:
+            self.log_area.delete(1.0, f"{total - LOG_MAX_LINES + 1}.0")
+        self.log_area.see(tk.END)
+        if self.log_handler.dropped:
+            self.log_frame.config(text=f"Scraping Log ({self.log_handler.dropped} lines dropped)")
 
 def main():
     root = tk.Tk()
@@ -301,7 +364,7 @@ def main():
     # Handle window close
     def on_closing():
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            if hasattr(app, 'scraping_thread') and app.scraping_thread.is_alive():
+            if app.scraping_thread is not None and app.scraping_thread.is_alive():
                 app.stop_scraping()
                 app.root.after(100, root.destroy)
             else: